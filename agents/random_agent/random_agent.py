@@ -1,3 +1,4 @@
+import importlib
 import logging
 from random import randint
 import traceback
@@ -41,6 +42,7 @@ class RandomAgent(DefaultParty):
         super().__init__()
         self.getReporter().log(logging.INFO, "party is initialized")
         self._profile = None
+        self._services = None
         self._lastReceivedBid: Bid = None
 
     # Override
@@ -51,8 +53,17 @@ class RandomAgent(DefaultParty):
             self._me = self._settings.getID()
             self._protocol: str = str(self._settings.getProtocol().getURI())
             self._progress = self._settings.getProgress()
+            # the runners of this repository offer shared profiles and a bid
+            # sampler through the "services" parameter
+            services = self._settings.getParameters().get("services")
+            if services != None:
+                self._services = importlib.import_module(services)
             if "Learn" == self._protocol:
                 self.getConnection().send(LearningDone(self._me))  # type:ignore
+            elif self._services != None:
+                self._profile = self._services.create_profile(
+                    info.getProfile().getURI(), self.getReporter()
+                )
             else:
                 self._profile = ProfileConnectionFactory.create(
                     info.getProfile().getURI(), self.getReporter()
@@ -101,10 +112,21 @@ class RandomAgent(DefaultParty):
         if self._isGood(self._lastReceivedBid):
             action = Accept(self._me, self._lastReceivedBid)
         else:
-            for _attempt in range(20):
-                bid = self._getRandomBid(self._profile.getProfile().getDomain())
-                if self._isGood(bid):
-                    break
+            profile = self._profile.getProfile()
+            sampler = None
+            if self._services != None:
+                sampler = self._services.get_bid_sampler(profile)
+            if sampler is not None:
+                # draw directly from the good bids, or any bid if there are none
+                bid = sampler.sample_above(0.6)
+                if bid == None:
+                    bid = sampler.sample()
+            else:
+                allBids = AllBidsList(profile.getDomain())
+                for _attempt in range(20):
+                    bid = allBids.get(randint(0, allBids.size() - 1))
+                    if self._isGood(bid):
+                        break
             action = Offer(self._me, bid)
         self.getConnection().send(action)
 
@@ -116,10 +138,6 @@ class RandomAgent(DefaultParty):
             return profile.getUtility(bid) > 0.6
         raise Exception("Can not handle this type of profile")
 
-    def _getRandomBid(self, domain: Domain) -> Bid:
-        allBids = AllBidsList(domain)
-        return allBids.get(randint(0, allBids.size() - 1))
-
     def _vote(self, voting: Voting) -> Votes:
         """
         @param voting the {@link Voting} object containing the options
@@ -1,3 +1,4 @@
+import importlib
 import logging
 from random import randint
 from typing import cast
@@ -34,6 +35,7 @@ class TemplateAgent(DefaultParty):
         super().__init__()
         self.getReporter().log(logging.INFO, "party is initialized")
         self._profile = None
+        self._services = None
         self._last_received_bid: Bid = None
 
     def notifyChange(self, info: Inform):
@@ -52,10 +54,21 @@ class TemplateAgent(DefaultParty):
             # progress towards the deadline has to be tracked manually through the use of the Progress object
             self._progress: ProgressRounds = self._settings.getProgress()
 
+            # the runners of this repository pass services (shared profiles and a bid sampler) as a parameter,
+            # elsewhere the agent works without them
+            services = self._settings.getParameters().get("services")
+            if services is not None:
+                self._services = importlib.import_module(services)
+
             # the profile contains the preferences of the agent over the domain
-            self._profile = ProfileConnectionFactory.create(
-                info.getProfile().getURI(), self.getReporter()
-            )
+            if self._services is not None:
+                self._profile = self._services.create_profile(
+                    info.getProfile().getURI(), self.getReporter()
+                )
+            else:
+                self._profile = ProfileConnectionFactory.create(
+                    info.getProfile().getURI(), self.getReporter()
+                )
         # ActionDone is an action send by an opponent (an offer or an accept)
         elif isinstance(info, ActionDone):
             action: Action = cast(ActionDone, info).getAction()
@@ -144,12 +157,20 @@ class TemplateAgent(DefaultParty):
             return profile.getUtility(last_bid) > 0.45 and profile.getUtility(last_bid) > profile.getUtility(next_bid)
 
     def _findBid(self) -> Bid:
-        # compose a list of all possible bids
-        domain = self._profile.getProfile().getDomain()
-        all_bids = AllBidsList(domain)
         progress = self._progress.get(0)
         profile = self._profile.getProfile()
 
+        # draw a random bid directly from the bids with utility better than 0.65 (0.6 after half time),
+        # the sampler is built once per profile and tells us exactly when there is no such bid
+        sampler = self._services.get_bid_sampler(profile) if self._services is not None else None
+        if sampler is not None:
+            bid = sampler.sample_above(0.65 if progress < 0.5 else 0.6)
+            return bid if bid is not None else sampler.sample()
+
+        # compose a list of all possible bids (no sampler, or domain too large for it)
+        domain = profile.getDomain()
+        all_bids = AllBidsList(domain)
+
         # take 50 attempts at finding a random bid that has utility better than 0.6
         for _ in range(50):
             bid = all_bids.get(randint(0, all_bids.size() - 1))
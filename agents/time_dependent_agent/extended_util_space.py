@@ -1,6 +1,5 @@
 from geniusweb.bidspace.BidsWithUtility import BidsWithUtility
 from geniusweb.bidspace.Interval import Interval
-from geniusweb.bidspace.IssueInfo import IssueInfo
 from geniusweb.issuevalue.Bid import Bid
 from geniusweb.issuevalue.Value import Value
 from geniusweb.profile.utilityspace.LinearAdditive import LinearAdditive
@@ -8,6 +7,10 @@ from tudelft.utilities.immutablelist.ImmutableList import ImmutableList
 from decimal import Decimal
 from typing import List
 
+# number of decimals of the weighted value utilities in BidsWithUtility (its
+# default), the utility of a bid is the sum of these rounded values
+PRECISION = 6
+
 
 class ExtendedUtilSpace:
     """
@@ -15,24 +18,51 @@ class ExtendedUtilSpace:
     class may change in the future, use at your own risk.
     """
 
-    def __init__(self, space: LinearAdditive):
+    def __init__(self, space: LinearAdditive, services=None):
+        """
+        @param space    the utility space
+        @param services the services of the runner (see TimeDependentAgent) or
+                        None. With services, bid searches go through the sorted
+                        bid index of the profile that they offer (built once per
+                        profile, or loaded from the on-disk index cache if
+                        enabled), unless the domain is too large for one.
+        """
         self._utilspace = space
-        self._bidutils = BidsWithUtility.create(self._utilspace)
+        self._bidutils = BidsWithUtility.create(self._utilspace, PRECISION)
         self._computeMinMax()
         self._tolerance = self._computeTolerance()
 
+        # the index uses the rounded utilities of BidsWithUtility, so both give
+        # the same bids (the index orders them on utility)
+        self._index = None
+        if services != None:
+            self._index = services.get_sorted_bid_index(self._utilspace, PRECISION)
+
+    def _getWeightedUtils(self) -> List[List[Decimal]]:
+        """
+        @return for every issue, the weighted utilities of all its values,
+                rounded as in BidsWithUtility.
+        """
+        return [
+            [iss.getWeightedUtil(val) for val in iss.getValues()]
+            for iss in self._bidutils.getInfo()
+        ]
+
     def _computeMinMax(self):
         """
         Computes the fields minutil and maxUtil.
         <p>
-        TODO this is simplistic, very expensive method and may cause us to run
-        out of time on large domains.
-        <p>
-        Assumes that utilspace and bidutils have been set properly.
+        The utility of a linear additive space is a sum over the issues, so the
+        minimum (maximum) is the sum of the minimum (maximum) weighted utility of
+        every issue (this equals BidsWithUtility.getRange). This takes O(total
+        number of values) instead of a walk over the bid space.
         """
-        range = self._bidutils.getRange()
-        self._minUtil = range.getMin()
-        self._maxUtil = range.getMax()
+        self._minUtil = Decimal(0)
+        self._maxUtil = Decimal(0)
+        for values in self._getWeightedUtils():
+            if values:
+                self._minUtil += min(values)
+                self._maxUtil += max(values)
 
         rvbid = self._utilspace.getReservationBid()
         if rvbid != None:
@@ -51,12 +81,9 @@ class ExtendedUtilSpace:
                 value.
         """
         tolerance = Decimal(1)
-        for iss in self._bidutils.getInfo():
-            if iss.getValues().size() > 1:
+        for values in self._getWeightedUtils():
+            if len(values) > 1:
                 # we have at least 2 values.
-                values: List[Decimal] = []
-                for val in iss.getValues():
-                    values.append(iss.getWeightedUtil(val))
                 values.sort()
                 values.reverse()
                 tolerance = min(tolerance, values[0] - values[1])
@@ -68,12 +95,31 @@ class ExtendedUtilSpace:
     def getMax(self) -> Decimal:
         return self._maxUtil
 
+    def hasIndex(self) -> bool:
+        """
+        @return true iff bid searches go through a sorted bid index, which makes
+                them cheap.
+        """
+        return self._index != None
+
     def getBids(self, utilityGoal: Decimal) -> ImmutableList[Bid]:
         """
         @param utilityGoal the requested utility
         @return bids with utility inside [utilitygoal-{@link #tolerance},
                 utilitygoal]
         """
+        if self._index != None:
+            return self._index.get_bids(utilityGoal - self._tolerance, utilityGoal)
         return self._bidutils.getBids(
             Interval(utilityGoal - self._tolerance, utilityGoal)
         )
+
+    def countBids(self, utilityGoal: Decimal) -> int:
+        """
+        @param utilityGoal the requested utility
+        @return the number of bids with utility inside
+                [utilitygoal-{@link #tolerance}, utilitygoal]
+        """
+        if self._index != None:
+            return self._index.count(utilityGoal - self._tolerance, utilityGoal)
+        return self.getBids(utilityGoal).size()
@@ -1,3 +1,4 @@
+import importlib
 import logging
 from random import randint, random
 import traceback
@@ -74,6 +75,13 @@ class TimeDependentAgent(DefaultParty):
     to simulate human users that take thinking time.</td>
     </tr>
 
+    <tr>
+    <td>services</td>
+    <td>Name of a module with services of the runner: shared profile
+    connections, a sorted bid index and the clock of the session. Set by the
+    runners of this repository, without it the party uses plain GeniusWeb.</td>
+    </tr>
+
     </table>
     <p>
     TimeDependentParty requires a {@link UtilitySpace}
@@ -82,6 +90,12 @@ class TimeDependentAgent(DefaultParty):
     def __init__(self, reporter: Reporter = None):
         super().__init__(reporter)
         self._profileint: ProfileInterface = None  # type:ignore
+        self._profileversion: int = 0
+        # services of the runner (shared profiles, bid index and clock), None
+        # if the runner does not offer them
+        self._services = None
+        self._sleep = sleep
+        self._clock = clock
         self._utilspace: LinearAdditive = None  # type:ignore
         self._me: PartyId = None  # type:ignore
         self._progress: Progress = None  # type:ignore
@@ -90,6 +104,9 @@ class TimeDependentAgent(DefaultParty):
         self._e: float = 1.2
         self._lastvotes: Votes = None  # type:ignore
         self._settings: Settings = None  # type:ignore
+        # utility goal and candidate bids per round, only under a round-based deadline
+        self._goals: List[Decimal] = None  # type:ignore
+        self._options: List[ImmutableList[Bid]] = None  # type:ignore
         self.getReporter().log(logging.INFO, "party is initialized")
 
     # Override
@@ -115,9 +132,18 @@ class TimeDependentAgent(DefaultParty):
                             logging.WARNING,
                             "parameter e should be Double but found " + str(newe),
                         )
+                services = self._settings.getParameters().get("services")
+                if services != None:
+                    self._services = importlib.import_module(services)
+                    self._sleep = self._services.sleep
+                    self._clock = self._services.time
                 protocol: str = str(self._settings.getProtocol().getURI())
                 if "Learn" == protocol:
                     val(self.getConnection()).send(LearningDone(self._me))
+                elif self._services != None:
+                    self._profileint = self._services.create_profile(
+                        self._settings.getProfile().getURI(), self.getReporter()
+                    )
                 else:
                     self._profileint = ProfileConnectionFactory.create(
                         self._settings.getProfile().getURI(), self.getReporter()
@@ -221,29 +247,86 @@ class TimeDependentAgent(DefaultParty):
         self.getConnection().send(myAction)
 
     def _updateUtilSpace(self) -> LinearAdditive:  # throws IOException
-        newutilspace = self._profileint.getProfile()
-        if not newutilspace == self._utilspace:
-            self._utilspace = cast(LinearAdditive, newutilspace)
-            self._extendedspace = ExtendedUtilSpace(self._utilspace)
+        if self._services != None:
+            # the version only changes when the profile is replaced, so derived
+            # structures are rebuilt without comparing profiles every turn
+            version = self._profileint.getVersion()
+            changed = version != self._profileversion
+            self._profileversion = version
+        else:
+            changed = not self._profileint.getProfile() == self._utilspace
+        if changed:
+            self._utilspace = cast(LinearAdditive, self._profileint.getProfile())
+            self._extendedspace = ExtendedUtilSpace(self._utilspace, self._services)
+            self._computeGoalTable()
         return self._utilspace
 
-    def _makeBid(self) -> Bid:
+    def _computeGoalTable(self):
         """
-        @return next possible bid with current target utility, or null if no such
-                bid.
+        Under a round-based deadline the time of every round is known in
+        advance, so the utility goal of every round is computed once here and
+        looked up during the negotiation. If the bids are indexed, the candidate
+        bids of every round are prepared as well (these are views on the index,
+        bids are only created when picked).
         """
-        time = self._progress.get(round(clock() * 1000))
-
-        utilityGoal = self._getUtilityGoal(
+        self._goals = None  # type:ignore
+        self._options = None  # type:ignore
+        if not isinstance(self._progress, ProgressRounds):
+            return
+        total = self._progress.getTotalRounds()
+        self._goals = [
+            self._getUtilityGoal(
+                rnd / total,
+                self.getE(),
+                self._extendedspace.getMin(),
+                self._extendedspace.getMax(),
+            )
+            for rnd in range(total + 1)
+        ]
+        if self._extendedspace.hasIndex():
+            options: Dict[Decimal, ImmutableList[Bid]] = {}
+            for goal in self._goals:
+                if not goal in options:
+                    options[goal] = self._findOptions(goal)
+            self._options = [options[goal] for goal in self._goals]
+
+    def _currentUtilityGoal(self) -> Decimal:
+        """
+        @return the utility goal at the current time, from the goal table under
+                a round-based deadline.
+        """
+        if self._goals != None:
+            return self._goals[min(self._progress.getCurrentRound(), len(self._goals) - 1)]
+        time = self._progress.get(round(self._clock() * 1000))
+        return self._getUtilityGoal(
             time,
             self.getE(),
             self._extendedspace.getMin(),
             self._extendedspace.getMax(),
         )
+
+    def _findOptions(self, utilityGoal: Decimal) -> ImmutableList[Bid]:
+        """
+        @return bids around the utility goal, or the max util bids if there are
+                none.
+        """
         options: ImmutableList[Bid] = self._extendedspace.getBids(utilityGoal)
         if options.size() == 0:
             # if we can't find good bid, get max util bid....
             options = self._extendedspace.getBids(self._extendedspace.getMax())
+        return options
+
+    def _makeBid(self) -> Bid:
+        """
+        @return next possible bid with current target utility, or null if no such
+                bid.
+        """
+        if self._options != None:
+            options = self._options[
+                min(self._progress.getCurrentRound(), len(self._options) - 1)
+            ]
+        else:
+            options = self._findOptions(self._currentUtilityGoal())
         # pick a random one.
         return options.get(randint(0, options.size() - 1))
 
@@ -296,13 +379,7 @@ class TimeDependentAgent(DefaultParty):
             return False
         profile = cast(LinearAdditive, self._profileint.getProfile())
         # the profile MUST contain UtilitySpace
-        time = self._progress.get(round(clock() * 1000))
-        return profile.getUtility(bid) >= self._getUtilityGoal(
-            time,
-            self.getE(),
-            self._extendedspace.getMin(),
-            self._extendedspace.getMax(),
-        )
+        return profile.getUtility(bid) >= self._currentUtilityGoal()
 
     def _delayResponse(self):  # throws InterruptedException
         """
@@ -313,4 +390,4 @@ class TimeDependentAgent(DefaultParty):
         """
         delay = self._settings.getParameters().getDouble("delay", 0, 0, 10000000)
         if delay > 0:
-            sleep(delay * (0.5 + random()))
+            self._sleep(delay * (0.5 + random()))
@@ -0,0 +1,216 @@
+"""
+Measures the decision latency of the bundled agents. Every agent negotiates against a fixed
+opponent on every domain, driven in-process (no NegoRunner), and the benchmark reports:
+    - setup time: handling of the Settings message and of the first YourTurn (which is where
+      most agents build their bid structures)
+    - turn latency percentiles over all YourTurn messages
+    - sessions per second
+The results are written to results/agent_benchmark.json so runs can be compared over time.
+Run from the repository root:
+
+    python -m benchmarks.agent_benchmark
+"""
+import importlib
+import json
+import os
+import platform
+import random
+import tempfile
+from datetime import datetime, timedelta
+from time import perf_counter
+from typing import Dict, List
+
+import numpy as np
+from geniusweb.actions.Accept import Accept
+from geniusweb.actions.Offer import Offer
+from geniusweb.actions.PartyId import PartyId
+from geniusweb.inform.ActionDone import ActionDone
+from geniusweb.inform.Agreements import Agreements
+from geniusweb.inform.Finished import Finished
+from geniusweb.inform.Settings import Settings
+from geniusweb.inform.YourTurn import YourTurn
+from geniusweb.progress.ProgressRounds import ProgressRounds
+from geniusweb.references.Parameters import Parameters
+from geniusweb.references.ProfileRef import ProfileRef
+from geniusweb.references.ProtocolRef import ProtocolRef
+from uri.uri import URI
+
+from utils import agent_services
+from utils.agent_services import SERVICES_PARAMETER
+from utils.domain_generator import values_for_size, write_domain
+
+# Settings of the benchmark:
+#   the agents to measure, each plays on profile A against the opponent on profile B
+#   the profile sets to use, synthetic domains of the given number of bids are generated in a temp dir
+benchmark_settings = {
+    "agents": [
+        "agents.boulware_agent.boulware_agent.BoulwareAgent",
+        "agents.conceder_agent.conceder_agent.ConcederAgent",
+        "agents.hardliner_agent.hardliner_agent.HardlinerAgent",
+        "agents.linear_agent.linear_agent.LinearAgent",
+        "agents.random_agent.random_agent.RandomAgent",
+        "agents.stupid_agent.stupid_agent.StupidAgent",
+        "agents.template_agent.template_agent.TemplateAgent",
+    ],
+    "opponent": "agents.hardliner_agent.hardliner_agent.HardlinerAgent",
+    "profile_sets": [
+        [f"domains/domain{i:02d}/profileA.json", f"domains/domain{i:02d}/profileB.json"] for i in range(10)
+    ]
+    + [["domains/jobs/jobsprofileA.json", "domains/jobs/jobsprofileB.json"]],
+    "synthetic_domains": [10 ** 5, 10 ** 6],
+    "deadline_rounds": 200,
+    "sessions": 3,
+    "seed": 0,
+}
+
+
+class _Connection:
+    """Connection of a party that keeps the actions it sends."""
+
+    def __init__(self):
+        self.actions = []
+
+    def send(self, action):
+        self.actions.append(action)
+
+    def addListener(self, listener):
+        pass
+
+    def removeListener(self, listener):
+        pass
+
+    def close(self):
+        pass
+
+
+def run_benchmark_session(agent_classes: list, profiles: list, rounds: int) -> Dict[str, dict]:
+    """
+    Runs one SAOP session in-process and times every notifyChange of both parties.
+
+    @return per party: settings_s, first_turn_s, turn latencies and the session time
+    """
+    start = perf_counter()
+    parties = []
+    connections = []
+    ids = []
+    for i, (agent_class, profile) in enumerate(zip(agent_classes, profiles), 1):
+        party = agent_class()
+        connection = _Connection()
+        party.connect(connection)
+        parties.append(party)
+        connections.append(connection)
+        ids.append(PartyId(f"{agent_class.__name__.lower()}_{i}"))
+
+    timings = [{"agent": type(party).__name__, "turns": []} for party in parties]
+    endtime = datetime.now() + timedelta(minutes=10)
+    for party, party_id, profile, timing in zip(parties, ids, profiles, timings):
+        settings = Settings(
+            party_id,
+            ProfileRef(URI(f"file:{profile}")),
+            ProtocolRef(URI("SAOP")),
+            ProgressRounds(rounds, 0, endtime),
+            # the services of the runners, so the agents are measured as they run in a tournament
+            Parameters({SERVICES_PARAMETER: agent_services.__name__}),
+        )
+        t0 = perf_counter()
+        party.notifyChange(settings)
+        timing["settings_s"] = perf_counter() - t0
+
+    agreements = {}
+    last_offer = None
+    for turn in range(2 * rounds):
+        current = turn % len(parties)
+        t0 = perf_counter()
+        parties[current].notifyChange(YourTurn())
+        timings[current]["turns"].append(perf_counter() - t0)
+        if not connections[current].actions:
+            break
+        action = connections[current].actions.pop()
+        for party in parties:
+            party.notifyChange(ActionDone(action))
+        if isinstance(action, Offer):
+            last_offer = action.getBid()
+        elif isinstance(action, Accept) and action.getBid() == last_offer:
+            agreements = {party_id: last_offer for party_id in ids}
+            break
+        else:
+            break
+    for party in parties:
+        party.notifyChange(Finished(Agreements(agreements)))
+
+    session_s = perf_counter() - start
+    for timing in timings:
+        timing["first_turn_s"] = timing["turns"][0] if timing["turns"] else None
+        timing["session_s"] = session_s
+    return dict(zip([str(party_id.getName()) for party_id in ids], timings))
+
+
+def summarize(values: List[float]) -> dict:
+    values = np.array(values)
+    return {
+        "count": int(len(values)),
+        "p50_ms": float(np.percentile(values, 50) * 1000),
+        "p90_ms": float(np.percentile(values, 90) * 1000),
+        "p99_ms": float(np.percentile(values, 99) * 1000),
+        "max_ms": float(values.max() * 1000),
+    }
+
+
+if __name__ == "__main__":
+    random.seed(benchmark_settings["seed"])
+
+    def load_class(classpath: str):
+        module, name = classpath.rsplit(".", 1)
+        return getattr(importlib.import_module(module), name)
+
+    opponent = load_class(benchmark_settings["opponent"])
+    with tempfile.TemporaryDirectory() as tmp:
+        profile_sets = list(benchmark_settings["profile_sets"])
+        for num_bids in benchmark_settings["synthetic_domains"]:
+            directory = os.path.join(tmp, f"synthetic_{num_bids}")
+            profile_sets.append(write_domain(directory, values_for_size(num_bids), seed=benchmark_settings["seed"]))
+
+        results = []
+        for profiles in profile_sets:
+            for agent in benchmark_settings["agents"]:
+                agent_class = load_class(agent)
+                sessions = []
+                start = perf_counter()
+                for _ in range(benchmark_settings["sessions"]):
+                    timings = run_benchmark_session(
+                        [agent_class, opponent], profiles, benchmark_settings["deadline_rounds"]
+                    )
+                    sessions.append(next(iter(timings.values())))
+                elapsed = perf_counter() - start
+
+                turns = [t for session in sessions for t in session["turns"]]
+                result = {
+                    "agent": agent.split(".")[-1],
+                    "domain": os.path.basename(os.path.dirname(profiles[0])),
+                    "profiles": profiles,
+                    "settings_ms": [session["settings_s"] * 1000 for session in sessions],
+                    "first_turn_ms": [
+                        session["first_turn_s"] * 1000 for session in sessions if session["first_turn_s"] is not None
+                    ],
+                    "turn_latency": summarize(turns) if turns else None,
+                    "sessions_per_s": len(sessions) / elapsed,
+                }
+                results.append(result)
+                p50 = result["turn_latency"]["p50_ms"] if turns else float("nan")
+                print(f"{result['agent']:>15} {profiles[0]:>40}: p50 {p50:.3f} ms, {result['sessions_per_s']:.2f} sessions/s")
+
+    if not os.path.exists("results"):
+        os.mkdir("results")
+    with open("results/agent_benchmark.json", "w") as f:
+        f.write(
+            json.dumps(
+                {
+                    "timestamp": datetime.now().isoformat(),
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "settings": benchmark_settings,
+                    "results": results,
+                },
+                indent=2,
+            )
+        )
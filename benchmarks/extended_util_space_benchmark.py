@@ -0,0 +1,84 @@
+"""
+Measures the construction time of ExtendedUtilSpace on synthetic linear additive
+domains of 10^3 to 10^9 bids. Run from the repository root:
+
+    python -m benchmarks.extended_util_space_benchmark
+"""
+import json
+import os
+import random
+from decimal import Decimal
+from time import perf_counter
+
+from geniusweb.bidspace.BidsWithUtility import BidsWithUtility
+from geniusweb.issuevalue.DiscreteValue import DiscreteValue
+from geniusweb.issuevalue.DiscreteValueSet import DiscreteValueSet
+from geniusweb.issuevalue.Domain import Domain
+from geniusweb.profile.utilityspace.DiscreteValueSetUtilities import DiscreteValueSetUtilities
+from geniusweb.profile.utilityspace.LinearAdditiveUtilitySpace import LinearAdditiveUtilitySpace
+
+from agents.time_dependent_agent.extended_util_space import ExtendedUtilSpace
+from utils import agent_services
+
+# Settings of the benchmark:
+#   every domain has 10 values per issue, so the number of issues sets the size of the bid space (10^issues)
+#   the index is only built up to index_limit bids (at most INDEX_LIMIT), larger domains measure the analytical setup alone
+#   the old setup (BidsWithUtility + getRange) is only measured up to legacy_limit bids, it gets very slow
+benchmark_settings = {
+    "issues": [3, 4, 5, 6, 7, 8, 9],
+    "values_per_issue": 10,
+    "index_limit": 10 ** 6,
+    "legacy_limit": 10 ** 5,
+    "repetitions": 3,
+    "seed": 0,
+}
+
+
+def create_space(num_issues: int, num_values: int, rng: random.Random) -> LinearAdditiveUtilitySpace:
+    issues = [f"issue{i}" for i in range(num_issues)]
+    values = [DiscreteValue(f"value{v}") for v in range(num_values)]
+    domain = Domain("benchmark", {issue: DiscreteValueSet(values) for issue in issues})
+    utilities = {
+        issue: DiscreteValueSetUtilities(
+            {value: Decimal(rng.randint(0, 100000)) / 100000 for value in values}
+        )
+        for issue in issues
+    }
+    # weights with exactly sum 1
+    weights = {issue: Decimal(1) / num_issues for issue in issues[:-1]}
+    weights[issues[-1]] = Decimal(1) - sum(weights.values())
+    return LinearAdditiveUtilitySpace(domain, "benchmark", utilities, weights)
+
+
+def best_time(function, repetitions: int) -> float:
+    times = []
+    for _ in range(repetitions):
+        start = perf_counter()
+        function()
+        times.append(perf_counter() - start)
+    return min(times)
+
+
+if __name__ == "__main__":
+    rng = random.Random(benchmark_settings["seed"])
+    results = []
+    for num_issues in benchmark_settings["issues"]:
+        space = create_space(num_issues, benchmark_settings["values_per_issue"], rng)
+        num_bids = benchmark_settings["values_per_issue"] ** num_issues
+        repetitions = benchmark_settings["repetitions"]
+
+        result = {"bids": num_bids}
+        result["analytical_s"] = best_time(lambda: ExtendedUtilSpace(space), repetitions)
+        if num_bids <= benchmark_settings["index_limit"]:
+            # the index is cached per profile in the registry, a space that did not come from the
+            # registry builds a new one every time
+            result["with_index_s"] = best_time(lambda: ExtendedUtilSpace(space, agent_services), 1)
+        if num_bids <= benchmark_settings["legacy_limit"]:
+            result["legacy_s"] = best_time(lambda: BidsWithUtility.create(space).getRange(), 1)
+        results.append(result)
+        print(", ".join(f"{k}: {v:.6f}" if isinstance(v, float) else f"{k}: {v}" for k, v in result.items()))
+
+    if not os.path.exists("results"):
+        os.mkdir("results")
+    with open("results/extended_util_space_benchmark.json", "w") as f:
+        f.write(json.dumps({"settings": benchmark_settings, "results": results}, indent=2))
@@ -0,0 +1,28 @@
+import json
+import os
+
+from utils.plot_trace import plot_trace
+from utils.trace_store import read_trace_store, write_trace_store
+
+# Settings to convert a session trace between the JSON format and the columnar trace store:
+#   The input is either a JSON trace (results_trace.json) or a trace store directory (results_trace.trace), it is
+#   converted to the other format. The conversion is lossless in both directions.
+#   Optionally the trace is plotted to an HTML file, straight from the columns for a trace store.
+export_settings = {
+    "input": "results/results_trace.trace",
+    "output": "results/results_trace.json",
+    "plot_file": None,
+}
+
+if os.path.isdir(export_settings["input"]):
+    store = read_trace_store(export_settings["input"])
+    with open(export_settings["output"], "w") as f:
+        f.write(json.dumps(store.to_json(), indent=2))
+    if export_settings["plot_file"] is not None:
+        plot_trace(store, export_settings["plot_file"])
+else:
+    with open(export_settings["input"], "r") as f:
+        results_trace = json.load(f)
+    write_trace_store(results_trace, export_settings["output"])
+    if export_settings["plot_file"] is not None:
+        plot_trace(read_trace_store(export_settings["output"]), export_settings["plot_file"])
@@ -0,0 +1,23 @@
+import os
+
+from utils.domain_generator import values_for_size, write_domain
+
+# Settings to generate a synthetic domain with a pair of profiles:
+#   The domain is written to the directory as <name>.json, profileA.json and profileB.json, the name is the directory name.
+#   We need to specify the number of values of every issue, values_for_size picks them for a bid space of a given size.
+#   The weight skew concentrates the issue weights on fewer issues (0 gives equal weights).
+#   The opposition sets how much the profiles conflict (0 independent, 1 every value good for A is bad for B).
+#   Equal settings and seed give equal files.
+generator_settings = {
+    "directory": "domains/synthetic/domain_1e6",
+    "values_per_issue": values_for_size(10 ** 6),
+    "weight_skew": 0.5,
+    "opposition": 0.5,
+    "seed": 0,
+}
+
+directory = generator_settings.pop("directory")
+if os.path.exists(directory):
+    print(f"{directory} already exists, files in it are overwritten")
+profiles = write_domain(directory, **generator_settings)
+print(f"Written {profiles[0]} and {profiles[1]}")
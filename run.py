@@ -5,6 +5,8 @@ from utils.plot_trace import plot_trace
 from utils.plot_trace import trace_special_points
 from utils.runners import run_session
 from utils.runners import get_special_points
+from utils.special_points import write_special_points
+from utils.trace_store import write_trace_store
 
 # create results directory if it does not exist
 if not os.path.exists("results"):
@@ -17,6 +19,11 @@ domain = "02"
 #   We need to specify the classpath of 2 agents to start a negotiation.
 #   We need to specify the preference profiles for both agents. The first profile will be assigned to the first agent.
 #   We need to specify a deadline of amount of rounds we can negotiate before we end without agreement
+#   We can time every action, the trace then shows the think time of every action and the summary the turn latencies
+#   We can choose the engine: "negorunner" (GeniusWeb) or "local", a faster in-process engine
+#   We can give the agents parameters, e.g. {"delay": 1.0} to let a time dependent agent simulate human think time
+#   We can run on a virtual clock with the local engine: sleeps of the agents then take no wall-clock time (the engine
+#   also reads its deadline from the virtual clock, so the outcome is that of a real-time run)
 settings = {
     "agents": [
         # "agents.boulware_agent.boulware_agent.BoulwareAgent",
@@ -29,8 +36,15 @@ settings = {
     ],
     "profiles": ["domains/domain{}/profileA.json".format(domain), "domains/domain{}/profileB.json".format(domain)],
     "deadline_rounds": 200,
+    "instrument": False,
+    "engine": "negorunner",
+    "parameters": [{}, {}],
+    "virtual_time": False,
 }
 
+# Format of the written trace: "json" or "columnar" (compact binary columns, convert to JSON with export_trace.py)
+trace_format = "json"
+
 # run a session and obtain results in dictionaries
 results_trace, results_summary = run_session(settings)
 accept_point = []
@@ -43,16 +57,21 @@ for index, action in enumerate(results_trace["actions"], 1):
             accept_point.append(util)
             agents_involved.append(agent)
 
-# Get the pareto optimal points + other special points
+# Get the pareto optimal points + other special points, computed first if the domain does not ship them
 special_points_file = "domains/domain{}/specials.json".format(domain)
+if not os.path.exists(special_points_file):
+    write_special_points(*settings["profiles"], special_points_file)
 special_points = get_special_points(special_points_file)
 trace_special_points(special_points, accept_point, agents_involved)
 
 # plot trace to html file
 plot_trace(results_trace, "results/trace_plot.html")
 
-# write results to file
-with open("results/results_trace.json", "w") as f:
-    f.write(json.dumps(results_trace, indent=2))
+# write results to file, long traces are much smaller in the columnar trace store (see export_trace.py)
+if trace_format == "columnar":
+    write_trace_store(results_trace, "results/results_trace.trace")
+else:
+    with open("results/results_trace.json", "w") as f:
+        f.write(json.dumps(results_trace, indent=2))
 with open("results/results_summary.json", "w") as f:
     f.write(json.dumps(results_summary, indent=2))
@@ -1,16 +1,38 @@
 import json
 import os
+from textwrap import indent
 
-from utils.runners import run_tournament
-
-# create results directory if it does not exist
-if not os.path.exists("results"):
-    os.mkdir("results")
+from utils.repetition import iter_repeated_tournament
+from utils.results_log import check_results_log
+from utils.runners import iter_tournament
 
 # Settings to run a tournament:
 #   We need to specify the classpath all agents that will participate in the tournament
 #   We need to specify duos of preference profiles that will be played by the agents
 #   We need to specify a deadline of amount of rounds we can negotiate before we end without agreement
+#   We can specify the number of worker processes that run sessions in parallel (1 runs them one after another), every
+#   worker imports the agents and loads the profiles once and then runs session after session
+#   We can specify a JSONL log to which every finished session is written immediately, with resume the sessions
+#   that are already in that log are skipped (e.g. after a crash or Ctrl-C). An existing log is never replaced
+#   by a new tournament, unless we allow overwriting it
+#   We can time every action, the summaries then show the turn latencies of every agent, the session time and the
+#   time spent logging
+#   We can choose the engine: "negorunner" (GeniusWeb) or "local", a faster in-process engine for large tournaments
+#   We can set the minimum level of the messages of the sessions that are printed (e.g. "INFO" to see everything), they
+#   are printed per session. With a log directory every session also gets its own log file
+#   We can specify a directory in which the bid indexes of the profiles are cached, so later sessions and tournaments
+#   map them from disk instead of building them again
+#   We can choose the order in which sessions are handed to the workers: "longest_first" starts the most expensive
+#   sessions first (estimated from domain size, deadline and the measured cost of the agents in the cost history file) so
+#   no single long session is left at the end, "tournament" keeps the tournament order
+#   We can give agents parameters (by classpath) and run the sessions on a virtual clock (local engine only), so
+#   simulated think times of the agents (e.g. {"delay": 1.0} for time dependent agents) take no wall-clock time, see run.py
+#   We can give every session and every single turn a wall-clock budget in seconds (None for no budget). A session that
+#   exceeds it is killed and recorded with "result": "ERROR" and the reason, the tournament carries on
+#   We can repeat every pairing with seeds until the confidence intervals (at the given confidence) on the utilities are at
+#   most target_width wide and the one on the agreement rate at most rate_target_width, with min_sessions to max_sessions
+#   sessions per pairing. The summaries then show the mean, confidence interval and number of sessions n per pairing (None
+#   runs every pairing once)
 tournament_settings = {
     "agents": [
         "agents.boulware_agent.boulware_agent.BoulwareAgent",
@@ -26,14 +48,51 @@ tournament_settings = {
         ["domains/domain01/profileA.json", "domains/domain01/profileB.json"],
     ],
     "deadline_rounds": 200,
+    "workers": 1,
+    "results_log": "results/results_log.jsonl",
+    "resume": False,
+    "overwrite": False,
+    "instrument": False,
+    "engine": "negorunner",
+    "log_level": "WARNING",
+    "log_dir": None,
+    "index_cache": ".cache/bid_indexes",
+    "schedule": "longest_first",
+    "cost_history": ".cache/cost_history.json",
+    "agent_parameters": {},
+    "virtual_time": False,
+    "session_timeout": None,
+    "turn_timeout": None,
+    "repetitions": None,
+    # "repetitions": {"target_width": 0.1, "rate_target_width": 0.5, "confidence": 0.95, "min_sessions": 5, "max_sessions": 50, "seed": 0},
 }
 
-# run a session and obtain results in dictionaries
-tournament, results_summaries = run_tournament(tournament_settings)
+# the worker processes of a parallel tournament import this file, so only run the tournament from the main process
+if __name__ == "__main__":
+    # create results directory if it does not exist
+    if not os.path.exists("results"):
+        os.mkdir("results")
+
+    # fail before anything of an earlier run is replaced if the results log may not be written
+    if tournament_settings["results_log"] is not None:
+        check_results_log(
+            tournament_settings["results_log"], tournament_settings["resume"], tournament_settings["overwrite"]
+        )
 
-# save the tournament settings for reference
-with open("results/tournament.json", "w") as f:
-    f.write(json.dumps(tournament, indent=2))
-# save the result summaries
-with open("results/results_summaries.json", "w") as f:
-    f.write(json.dumps(results_summaries, indent=2))
+    # run the sessions and write the tournament settings and result summaries as they come in, to temporary files
+    # that only replace the ones of an earlier run when the tournament is complete
+    with open("results/tournament.json.tmp", "w") as f_tournament, open("results/results_summaries.json.tmp", "w") as f_summaries:
+        f_tournament.write("[")
+        f_summaries.write("[")
+        if tournament_settings["repetitions"] is None:
+            results = iter_tournament(tournament_settings)
+        else:
+            results = iter_repeated_tournament(tournament_settings)
+        for i, (settings, results_summary) in enumerate(results):
+            separator = ",\n" if i > 0 else "\n"
+            f_tournament.write(separator + indent(json.dumps(settings, indent=2), "  "))
+            f_summaries.write(separator + indent(json.dumps(results_summary, indent=2), "  "))
+        f_tournament.write("\n]")
+        f_summaries.write("\n]")
+    os.replace("results/tournament.json.tmp", "results/tournament.json")
+    os.replace("results/results_summaries.json.tmp", "results/results_summaries.json")
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+from geniusweb.bidspace.AllBidsList import AllBidsList
+from geniusweb.issuevalue.Bid import Bid
+
+from utils.bid_codec import BidCodec
+from utils.profile_registry import PROFILE_REGISTRY
+
+DOMAINS = ["domains/domain00/profileA.json", "domains/domain09/profileA.json", "domains/jobs/jobsprofileA.json"]
+
+
+def domain_of(profile_file: str):
+    return PROFILE_REGISTRY.get_profile(profile_file).getDomain()
+
+
+@pytest.mark.parametrize("profile_file", DOMAINS)
+def test_round_trip(profile_file):
+    codec = BidCodec(domain_of(profile_file))
+    size = codec.get_space_size()
+    assert size == AllBidsList(codec.get_domain()).size()
+
+    for rank in range(size):
+        assert codec.encode(codec.decode(rank)) == rank
+    ranks = np.arange(size, dtype=np.int64)
+    bids = codec.decode_batch(ranks)
+    assert len(set(bids)) == size
+    assert np.array_equal(codec.encode_batch(bids), ranks)
+    assert np.array_equal(codec.to_ranks(codec.to_digits(ranks)), ranks)
+
+
+@pytest.mark.parametrize("profile_file", DOMAINS)
+def test_for_all_bids_list(profile_file):
+    domain = domain_of(profile_file)
+    codec = BidCodec.for_all_bids_list(domain)
+    all_bids = AllBidsList(domain)
+    for i in range(0, all_bids.size(), 7):
+        assert codec.encode(all_bids.get(i)) == i
+
+
+def test_same_encoding_in_every_process_order():
+    domain = domain_of("domains/domain09/profileA.json")
+    default = BidCodec(domain)
+    assert default.get_issues() == sorted(domain.getIssues())
+    assert default.same_encoding(BidCodec(domain, sorted(domain.getIssues())))
+    assert not default.same_encoding(BidCodec(domain, sorted(domain.getIssues(), reverse=True)))
+
+
+def test_invalid_bids():
+    codec = BidCodec(domain_of("domains/jobs/jobsprofileA.json"))
+    bid = codec.decode(0)
+    issues = codec.get_issues()
+    partial = Bid({issue: bid.getValue(issue) for issue in issues[1:]})
+
+    assert codec.value_indices(partial)[0] == -1
+    with pytest.raises(ValueError):
+        codec.encode(partial)
+    with pytest.raises(ValueError):
+        codec.encode_batch([bid, partial])
+    with pytest.raises(IndexError):
+        codec.decode(codec.get_space_size())
@@ -0,0 +1,60 @@
+import random
+from decimal import Decimal
+
+import pytest
+from geniusweb.bidspace.AllBidsList import AllBidsList
+
+from utils.bid_index import SortedBidIndex
+from utils.compiled_profile import CompiledProfile
+from utils.profile_registry import PROFILE_REGISTRY
+
+PROFILES = ["domains/domain09/profileA.json", "domains/domain06/profileB.json", "domains/jobs/jobsprofileB.json"]
+
+
+def brute_force(compiled: CompiledProfile) -> list:
+    """@return (bid, exact utility) of every bid of the domain"""
+    bids = AllBidsList(compiled.get_codec().get_domain())
+    return [(bid, compiled.get_exact_utility(bid)) for bid in (bids.get(i) for i in range(bids.size()))]
+
+
+def intervals(utilities: list) -> list:
+    """@return intervals with bounds on exact bid utilities (the edge cases) and in between them"""
+    rng = random.Random(0)
+    points = sorted(set(utilities))
+    result = [(points[0], points[-1]), (points[-1], points[-1]), (points[0] - 1, points[0] - Decimal("1e-9"))]
+    for _ in range(20):
+        low, high = sorted(rng.sample(points, 2))
+        result += [(low, high), ((low + high) / 2, high), (low, low + Decimal("1e-7"))]
+    return result
+
+
+@pytest.mark.parametrize("profile_file", PROFILES)
+@pytest.mark.parametrize("precision", [None, 6])
+def test_get_bids_matches_brute_force(profile_file, precision):
+    profile = PROFILE_REGISTRY.get_profile(profile_file)
+    compiled = CompiledProfile(profile, precision=precision)
+    index = SortedBidIndex(profile, compiled)
+    bids = brute_force(compiled)
+    assert index.size() == len(bids)
+
+    for low, high in intervals([utility for _, utility in bids]):
+        expected = {bid for bid, utility in bids if low <= utility <= high}
+        found = index.get_bids(low, high)
+        assert {found.get(i) for i in range(found.size())} == expected
+        assert index.count(low, high) == len(expected)
+        # ordered on utility
+        found_utilities = [compiled.get_exact_utility(found.get(i)) for i in range(found.size())]
+        assert found_utilities == sorted(found_utilities)
+
+
+@pytest.mark.parametrize("profile_file", PROFILES)
+def test_position_above_matches_brute_force(profile_file):
+    profile = PROFILE_REGISTRY.get_profile(profile_file)
+    index = SortedBidIndex(profile)
+    utilities = [utility for _, utility in brute_force(index.get_compiled())]
+
+    for threshold in sorted(set(utilities))[::5] + [Decimal(0), Decimal(1)]:
+        for strict in [True, False]:
+            above = sum(utility > threshold or (utility == threshold and not strict) for utility in utilities)
+            assert index.size() - index.position_above(threshold, strict) == above
+
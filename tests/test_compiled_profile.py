@@ -0,0 +1,69 @@
+from decimal import Decimal
+
+import numpy as np
+import pytest
+from geniusweb.bidspace.AllBidsList import AllBidsList
+from geniusweb.bidspace.BidsWithUtility import BidsWithUtility
+from geniusweb.issuevalue.Bid import Bid
+
+from utils.compiled_profile import UTILITY_TOLERANCE, CompiledProfile, batch_utilities
+from utils.profile_registry import PROFILE_REGISTRY
+
+PROFILES = ["domains/domain09/profileA.json", "domains/domain09/profileB.json", "domains/jobs/jobsprofileA.json"]
+
+
+def all_bids(profile) -> list:
+    bids = AllBidsList(profile.getDomain())
+    return [bids.get(i) for i in range(bids.size())]
+
+
+@pytest.mark.parametrize("profile_file", PROFILES)
+def test_utilities_match_decimal_utility(profile_file):
+    profile = PROFILE_REGISTRY.get_profile(profile_file)
+    compiled = CompiledProfile(profile)
+    bids = all_bids(profile)
+
+    expected = np.array([float(profile.getUtility(bid)) for bid in bids])
+    assert np.abs(compiled.utilities(compiled.encode_bids(bids)) - expected).max() <= UTILITY_TOLERANCE
+    # the ranks of the codec enumerate the same bid space
+    ranks = np.arange(compiled.get_space_size(), dtype=np.int64)
+    assert sorted(compiled.utilities(compiled.decode_ranks(ranks))) == pytest.approx(sorted(expected), abs=UTILITY_TOLERANCE)
+    for bid in bids[:: max(1, len(bids) // 50)]:
+        assert compiled.get_exact_utility(bid) == profile.getUtility(bid)
+
+
+@pytest.mark.parametrize("profile_file", PROFILES)
+def test_partial_bids(profile_file):
+    profile = PROFILE_REGISTRY.get_profile(profile_file)
+    compiled = CompiledProfile(profile)
+    bid = all_bids(profile)[-1]
+    issues = sorted(bid.getIssues())
+    partial = Bid({issue: bid.getValue(issue) for issue in issues[1:]})
+
+    assert compiled.encode(partial)[0] == -1
+    assert compiled.get_utility(partial) == pytest.approx(float(profile.getUtility(partial)), abs=UTILITY_TOLERANCE)
+    assert compiled.decode(compiled.encode(partial)) == partial
+
+
+@pytest.mark.parametrize("profile_file", PROFILES)
+def test_precision_matches_bids_with_utility(profile_file):
+    profile = PROFILE_REGISTRY.get_profile(profile_file)
+    compiled = CompiledProfile(profile, precision=6)
+    infos = BidsWithUtility.create(profile, 6).getInfo()
+
+    for bid in all_bids(profile)[::7]:
+        expected = sum((info.getWeightedUtil(bid.getValue(info.getName())) for info in infos), Decimal(0))
+        assert compiled.get_exact_utility(bid) == expected
+        assert compiled.get_utility(bid) == pytest.approx(float(expected), abs=UTILITY_TOLERANCE)
+
+
+def test_batch_utilities_encodes_once_per_domain():
+    profile_a = PROFILE_REGISTRY.get_profile("domains/domain09/profileA.json")
+    profile_b = PROFILE_REGISTRY.get_profile("domains/domain09/profileB.json")
+    profiles = {"party_1": CompiledProfile(profile_a), "party_2": CompiledProfile(profile_b)}
+    bids = all_bids(profile_a)[:100]
+
+    utilities = batch_utilities(profiles, bids)
+    for party, profile in [("party_1", profile_a), ("party_2", profile_b)]:
+        expected = [float(profile.getUtility(bid)) for bid in bids]
+        assert utilities[party] == pytest.approx(expected, abs=UTILITY_TOLERANCE)
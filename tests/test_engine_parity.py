@@ -0,0 +1,43 @@
+import pytest
+
+from utils.runners import run_session
+from utils.std_out_reporter import BufferedReporter
+
+PAIRINGS = [
+    ["agents.boulware_agent.boulware_agent.BoulwareAgent", "agents.conceder_agent.conceder_agent.ConcederAgent"],
+    ["agents.random_agent.random_agent.RandomAgent", "agents.linear_agent.linear_agent.LinearAgent"],
+    ["agents.template_agent.template_agent.TemplateAgent", "agents.hardliner_agent.hardliner_agent.HardlinerAgent"],
+]
+
+
+def normalize(trace, party_ids: dict):
+    """@return the trace with the party ids replaced by their position and the deadline endtime left out"""
+    if isinstance(trace, dict):
+        return {
+            party_ids.get(key, key): normalize(value, party_ids) for key, value in trace.items() if key != "endtime"
+        }
+    if isinstance(trace, list):
+        return [normalize(value, party_ids) for value in trace]
+    return party_ids.get(trace, trace) if isinstance(trace, str) else trace
+
+
+def run(agents: list, engine: str) -> tuple:
+    settings = {
+        "agents": agents,
+        "profiles": ["domains/domain04/profileA.json", "domains/domain04/profileB.json"],
+        "deadline_rounds": 50,
+        "seed": 3,
+        "engine": engine,
+    }
+    with BufferedReporter() as reporter:
+        results_trace, results_summary = run_session(settings, reporter=reporter)
+    party_ids = {party: f"party_{position}" for position, party in enumerate(results_trace["partyprofiles"], 1)}
+    return normalize(results_trace, party_ids), results_summary
+
+
+@pytest.mark.parametrize("agents", PAIRINGS)
+def test_local_engine_matches_negorunner(agents):
+    trace, summary = run(agents, "negorunner")
+    local_trace, local_summary = run(agents, "local")
+    assert local_summary == summary
+    assert local_trace == trace
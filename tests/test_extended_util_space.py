@@ -0,0 +1,55 @@
+from decimal import Decimal
+
+import pytest
+from geniusweb.bidspace.BidsWithUtility import BidsWithUtility
+from geniusweb.bidspace.Interval import Interval
+
+from agents.time_dependent_agent.extended_util_space import ExtendedUtilSpace
+from utils import agent_services
+from utils.profile_registry import PROFILE_REGISTRY
+
+PROFILES = ["domains/domain03/profileA.json", "domains/domain09/profileB.json", "domains/jobs/jobsprofileA.json"]
+
+
+class BaselineUtilSpace:
+    """The setup of ExtendedUtilSpace before the index: everything through BidsWithUtility."""
+
+    def __init__(self, space):
+        self.bidutils = BidsWithUtility.create(space)
+        range = self.bidutils.getRange()
+        self.min, self.max = range.getMin(), range.getMax()
+        rvbid = space.getReservationBid()
+        if rvbid is not None and space.getUtility(rvbid) > self.min:
+            self.min = space.getUtility(rvbid)
+        self.tolerance = Decimal(1)
+        for iss in self.bidutils.getInfo():
+            values = sorted((iss.getWeightedUtil(val) for val in iss.getValues()), reverse=True)
+            if len(values) > 1:
+                self.tolerance = min(self.tolerance, values[0] - values[1])
+
+    def get_bids(self, goal: Decimal) -> set:
+        bids = self.bidutils.getBids(Interval(goal - self.tolerance, goal))
+        return {bids.get(i) for i in range(bids.size())}
+
+
+def goals(baseline: BaselineUtilSpace):
+    """utility goals spread over the range of the profile, plus both extremes"""
+    return [baseline.min + (baseline.max - baseline.min) * Decimal(i) / 20 for i in range(21)]
+
+
+@pytest.mark.parametrize("profile_file", PROFILES)
+@pytest.mark.parametrize("services", [None, agent_services], ids=["analytical", "index"])
+def test_equivalent_to_bids_with_utility(profile_file, services):
+    profile = PROFILE_REGISTRY.get_profile(profile_file)
+    baseline = BaselineUtilSpace(profile)
+    space = ExtendedUtilSpace(profile, services)
+    assert space.hasIndex() == (services is not None)
+
+    assert space.getMin() == baseline.min
+    assert space.getMax() == baseline.max
+    assert space._tolerance == baseline.tolerance
+    for goal in goals(baseline):
+        bids = space.getBids(goal)
+        # the same bids, the index returns them in order of utility
+        assert {bids.get(i) for i in range(bids.size())} == baseline.get_bids(goal)
+        assert space.countBids(goal) == bids.size()
@@ -0,0 +1,24 @@
+import numpy as np
+
+from utils.bid_index import SortedBidIndex
+from utils.compiled_profile import CompiledProfile
+from utils.index_cache import load_index, store_index
+from utils.profile_registry import PROFILE_REGISTRY
+
+PROFILE = "domains/domain09/profileA.json"
+
+
+def test_cache_round_trip(tmp_path):
+    profile = PROFILE_REGISTRY.get_profile(PROFILE)
+    sha256 = PROFILE_REGISTRY.get_hash(PROFILE)
+    index = SortedBidIndex(profile)
+    entry = str(tmp_path / sha256)
+    store_index(entry, index, sha256)
+
+    loaded = load_index(entry, profile, index.get_compiled(), sha256)
+    assert loaded is not None
+    for built, read in zip(index.get_arrays(), loaded.get_arrays()):
+        assert np.array_equal(built, read)
+    # an index of another profile or precision is not accepted
+    assert load_index(entry, profile, index.get_compiled(), "0" * 64) is None
+    assert load_index(entry, profile, CompiledProfile(profile, precision=6), sha256) is None
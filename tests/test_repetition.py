@@ -0,0 +1,60 @@
+import math
+
+import pytest
+
+from utils.repetition import mean_ci, sessions_needed, summarize_repetitions, wilson_ci
+
+
+def summary(utility_1: float, utility_2: float, result: str = "agreement") -> dict:
+    return {
+        "agent_1": "BoulwareAgent",
+        "agent_2": "RandomAgent",
+        "utility_1": utility_1,
+        "utility_2": utility_2,
+        "nash_product": utility_1 * utility_2,
+        "social_welfare": utility_1 + utility_2,
+        "result": result,
+    }
+
+
+def test_mean_ci():
+    mean, ci = mean_ci([0.0, 1.0, 0.0, 1.0])
+    half = 1.959964 * math.sqrt(1 / 3) / 2
+    assert mean == 0.5
+    assert ci == pytest.approx([0.5 - half, 0.5 + half])
+    assert mean_ci([0.3, 0.3, 0.3]) == (pytest.approx(0.3), pytest.approx([0.3, 0.3]))
+    assert mean_ci([0.3]) == (0.3, [-math.inf, math.inf])
+    # a higher confidence gives a wider interval
+    assert mean_ci([0.0, 1.0, 0.0, 1.0], 0.99)[1][1] > ci[1]
+
+
+def test_wilson_ci():
+    rate, ci = wilson_ci(5, 5)
+    assert rate == 1.0
+    assert ci == pytest.approx([0.5655, 1.0], abs=1e-4)
+    assert wilson_ci(0, 5)[1] == pytest.approx([0.0, 1 - 0.5655], abs=1e-4)
+    rate, ci = wilson_ci(3, 10)
+    assert ci[0] < rate < ci[1]
+    assert ci == pytest.approx([0.1078, 0.6032], abs=1e-4)
+
+
+def test_constant_pairing_stops_after_the_first_batch():
+    results_summary = summarize_repetitions([summary(0.8, 0.6) for _ in range(5)])
+    assert results_summary["agreement_rate_ci"][1] - results_summary["agreement_rate_ci"][0] > 0.4
+    assert sessions_needed(results_summary, 0.1, 0.5) == 5
+    # with the agreement rate held to the utility target it would run about 95 sessions
+    assert sessions_needed(results_summary, 0.1, 0.1) == 95
+
+
+def test_batch_grows_with_the_variance():
+    utilities = [0.2, 0.9, 0.4, 0.7, 0.5]
+    results_summary = summarize_repetitions([summary(u, 1 - u) for u in utilities])
+    width = results_summary["utility_1_ci"][1] - results_summary["utility_1_ci"][0]
+    assert sessions_needed(results_summary, 0.1, 0.5) == math.ceil(5 * (width / 0.1) ** 2)
+    assert sessions_needed(results_summary, width, 0.5) == 5
+
+    # the agreement rate drives the batch when the utilities are constant but the outcome is not
+    outcomes = ["agreement", "failed", "agreement", "failed", "agreement"]
+    results_summary = summarize_repetitions([summary(0.5, 0.5, result) for result in outcomes])
+    width = results_summary["agreement_rate_ci"][1] - results_summary["agreement_rate_ci"][0]
+    assert sessions_needed(results_summary, 0.1, 0.5) == math.ceil(5 * (width / 0.5) ** 2) > 5
@@ -0,0 +1,93 @@
+import os
+import runpy
+
+import pytest
+
+from utils.results_log import ResultsLog
+
+RUN_TOURNAMENT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "run_tournament.py")
+
+TOURNAMENT = {
+    "agents": [
+        "agents.boulware_agent.boulware_agent.BoulwareAgent",
+        "agents.conceder_agent.conceder_agent.ConcederAgent",
+    ],
+    "profile_sets": [["domains/domain00/profileA.json", "domains/domain00/profileB.json"]],
+    "deadline_rounds": 200,
+}
+
+
+def summary(index: int) -> dict:
+    return {"num_offers": index, "result": "agreement"}
+
+
+def test_resume_cuts_off_a_truncated_last_line(tmp_path):
+    path = str(tmp_path / "results_log.jsonl")
+    with ResultsLog(path) as log:
+        log.append({"session": 0}, summary(0))
+        log.append({"session": 1}, summary(1))
+    complete = os.path.getsize(path)
+    with open(path, "a") as f:
+        f.write('{"settings": {"session": 2}, "summ')
+
+    with ResultsLog(path, resume=True) as log:
+        assert os.path.getsize(path) == complete
+        assert {"session": 1} in log and {"session": 2} not in log
+        assert log.get({"session": 0}) == summary(0)
+        assert log.get({"session": 2}) is None
+        log.append({"session": 2}, summary(2))
+    with ResultsLog(path, resume=True) as log:
+        assert [log.get({"session": i}) for i in range(3)] == [summary(i) for i in range(3)]
+
+
+def test_existing_log_is_only_replaced_with_overwrite(tmp_path):
+    path = str(tmp_path / "results_log.jsonl")
+    with ResultsLog(path) as log:
+        log.append({"session": 0}, summary(0))
+    with open(path, "rb") as f:
+        contents = f.read()
+
+    with pytest.raises(FileExistsError):
+        ResultsLog(path)
+    with open(path, "rb") as f:
+        assert f.read() == contents
+
+    with ResultsLog(path, overwrite=True) as log:
+        assert {"session": 0} not in log
+    assert os.path.getsize(path) == 0
+
+
+def test_finished_sessions_are_skipped(tmp_path):
+    from utils.runners import iter_tournament, tournament_sessions
+
+    path = str(tmp_path / "results_log.jsonl")
+    sessions = tournament_sessions(TOURNAMENT)
+    with ResultsLog(path) as log:
+        for index, settings in enumerate(sessions):
+            log.append(settings, summary(index))
+
+    # every session is in the log, so none is played and the logged summaries come back in tournament order
+    settings = dict(TOURNAMENT, results_log=path, resume=True, cost_history=None)
+    assert list(iter_tournament(settings)) == [(session, summary(i)) for i, session in enumerate(sessions)]
+    with ResultsLog(path, resume=True) as log:
+        assert all(session in log for session in sessions)
+
+
+def test_rerun_without_resume_leaves_the_results_untouched(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.mkdir("results")
+    outputs = {
+        "results/results_log.jsonl": '{"settings": {}, "summary": {}}\n',
+        "results/tournament.json": "[\n  {}\n]",
+        "results/results_summaries.json": "[\n  {}\n]",
+    }
+    for path, contents in outputs.items():
+        with open(path, "w") as f:
+            f.write(contents)
+
+    with pytest.raises(FileExistsError):
+        runpy.run_path(RUN_TOURNAMENT, run_name="__main__")
+    for path, contents in outputs.items():
+        with open(path, "r") as f:
+            assert f.read() == contents
+    assert sorted(os.listdir("results")) == sorted(os.path.basename(path) for path in outputs)
@@ -0,0 +1,34 @@
+import glob
+import json
+import os
+
+import pytest
+
+from utils.special_points import compute_special_points
+
+DOMAINS = sorted(os.path.dirname(path) for path in glob.glob("domains/domain*/specials.json"))
+
+
+def by_bid(points: list) -> dict:
+    """@return the utilities of the special points by their bid"""
+    return {tuple(sorted(point["bid"].items())): point["utility"] for point in points}
+
+
+@pytest.mark.parametrize("domain", DOMAINS)
+def test_matches_shipped_specials(domain):
+    with open(os.path.join(domain, "specials.json"), "r") as f:
+        expected = json.load(f)
+    specials = compute_special_points(os.path.join(domain, "profileA.json"), os.path.join(domain, "profileB.json"))
+
+    for name in ["nash", "kalai"]:
+        assert specials[name]["bid"] == expected[name]["bid"]
+        assert specials[name]["utility"] == pytest.approx(expected[name]["utility"], abs=1e-9)
+    front, expected_front = by_bid(specials["pareto_front"]), by_bid(expected["pareto_front"])
+    assert front.keys() == expected_front.keys()
+    for bid, utilities in front.items():
+        assert utilities == pytest.approx(expected_front[bid], abs=1e-9)
+
+
+def test_chunk_size_does_not_change_the_frontier():
+    profiles = ("domains/domain09/profileA.json", "domains/domain09/profileB.json")
+    assert compute_special_points(*profiles, chunk_size=7) == compute_special_points(*profiles)
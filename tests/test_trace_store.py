@@ -0,0 +1,80 @@
+import random
+
+import numpy as np
+import pytest
+from pyson.ObjectMapper import ObjectMapper
+
+from utils.compiled_profile import CompiledProfile
+from utils.profile_registry import PROFILE_REGISTRY
+from utils.trace_store import read_trace_store, write_trace_store
+
+PROFILES = ["domains/domain09/profileA.json", "domains/domain09/profileB.json"]
+
+
+def make_trace(profiles, num_offers: int = 40, instrumented: bool = False) -> dict:
+    """@return a trace in the shape of run_session with random offers, an accept and an action that does not fit the columns"""
+    rng = random.Random(0)
+    parties = ["party_1", "party_2"]
+    compiled = [CompiledProfile(PROFILE_REGISTRY.get_profile(profile)) for profile in PROFILES]
+    codec = compiled[0].get_codec()
+    mapper = ObjectMapper()
+
+    actions = []
+    for n in range(num_offers + 1):
+        bid = codec.decode(rng.randrange(codec.get_space_size()))
+        offer = {
+            "actor": parties[n % 2],
+            "bid": {"issuevalues": {issue: mapper.toJson(bid.getValue(issue)) for issue in bid.getIssues()}},
+            "utilities": {party: profile.get_utility(bid) for party, profile in zip(parties, compiled)},
+        }
+        if instrumented:
+            offer["time"] = n * 0.01 + rng.random() / 3
+            offer["think_time"] = None if n == 0 else rng.random() / 7
+        actions.append({"Accept" if n == num_offers else "Offer": offer})
+    actions.insert(3, {"EndNegotiation": {"actor": parties[0]}})
+
+    return {
+        "actions": actions,
+        "partyprofiles": {
+            party: {"party": {"partyref": "pythonpath:agents.x.X", "parameters": {}}, "profile": f"file:{profile}"}
+            for party, profile in zip(parties, profiles)
+        },
+        "connections": parties,
+        "progress": {"ProgressRounds": {"duration": 200, "currentRound": num_offers // 2, "endtime": 0}},
+        "error": None,
+    }
+
+
+@pytest.mark.parametrize("instrumented", [False, True])
+def test_round_trip(tmp_path, instrumented):
+    trace = make_trace(PROFILES, instrumented=instrumented)
+    write_trace_store(trace, str(tmp_path / "trace"))
+
+    store = read_trace_store(str(tmp_path / "trace"))
+    assert len(store) == len(trace["actions"])
+    assert store.columns["utilities"].dtype == np.float64
+    assert store.to_json() == trace
+
+
+def test_round_trip_without_profiles(tmp_path):
+    """the store does not need the profiles to restore the exact trace"""
+    trace = make_trace([str(tmp_path / "missing_a.json"), str(tmp_path / "missing_b.json")])
+    write_trace_store(trace, str(tmp_path / "trace"))
+
+    store = read_trace_store(str(tmp_path / "trace"), mmap=False)
+    assert store.meta["raw_actions"].keys() == {"3"}
+    assert store.to_json() == trace
+
+
+def test_bids_are_codec_ranks(tmp_path):
+    trace = make_trace(PROFILES)
+    write_trace_store(trace, str(tmp_path / "trace"))
+    store = read_trace_store(str(tmp_path / "trace"))
+
+    codec = CompiledProfile(PROFILE_REGISTRY.get_profile(PROFILES[0])).get_codec()
+    offers = [next(iter(action.values())) for action in trace["actions"] if "bid" in next(iter(action.values()))]
+    codes = store.columns["bid"][store.columns["type"] >= 0]
+    assert store.decode_bids(codes) == [offer["bid"]["issuevalues"] for offer in offers]
+    for code, offer in zip(codes, offers):
+        bid = codec.decode(int(code))
+        assert {issue: ObjectMapper().toJson(bid.getValue(issue)) for issue in bid.getIssues()} == offer["bid"]["issuevalues"]
@@ -0,0 +1,36 @@
+import os
+import signal
+import time
+
+from utils.watchdog import TASK
+from utils.worker_pool import WorkerPool
+
+
+def double(x: int) -> int:
+    time.sleep(0.05)
+    return 2 * x
+
+
+def test_idle_worker_that_dies_is_replaced():
+    with WorkerPool(2, double) as pool:
+        dead = pool._processes[0]
+        os.kill(dead.pid, signal.SIGKILL)
+        dead.join()
+
+        for task_id in range(1, 9):
+            pool.submit(task_id, (task_id,))
+        assert sorted((task_id, result) for task_id, result, _ in pool.results()) == [(i, 2 * i) for i in range(1, 9)]
+        assert pool._processes[0] is not dead
+        assert all(process.is_alive() for process in pool._processes)
+
+
+def test_task_of_a_worker_that_dies_gets_on_timeout():
+    with WorkerPool(1, double, on_timeout=lambda args, reason: (args, reason)) as pool:
+        pool.submit(0, (1,))
+        while pool._slots[0][TASK] < 0:
+            time.sleep(0.001)
+        pool._processes[0].kill()
+        [(task_id, (args, reason), _)] = pool.results()
+        assert task_id == 0 and args == (1,) and reason.startswith("worker process died")
+        pool.submit(1, (2,))
+        assert [(task_id, result) for task_id, result, _ in pool.results()] == [(1, 4)]
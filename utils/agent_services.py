@@ -0,0 +1,46 @@
+"""
+Services of the runners for the agents of this repository. The agents do not import utils:
+run_session passes the name of this module in the party parameter "services" and an agent that
+finds it there imports it. Without the parameter (e.g. a submission that runs elsewhere) the
+agents fall back to plain GeniusWeb.
+"""
+from typing import Optional
+
+from geniusweb.profile.utilityspace.LinearAdditive import LinearAdditive
+from geniusweb.profileconnection.ProfileInterface import ProfileInterface
+from tudelft_utilities_logging.Reporter import Reporter
+from uri.uri import URI
+
+from utils import index_cache
+from utils.bid_index import INDEX_LIMIT, SortedBidIndex, within_index_limit
+from utils.profile_registry import PROFILE_REGISTRY
+
+# offered to the agents as they are
+from utils.bid_sampler import get_bid_sampler
+from utils.virtual_clock import sleep, time
+
+# name of the party parameter that holds the name of this module
+SERVICES_PARAMETER = "services"
+
+
+def create_profile(uri: URI, reporter: Reporter) -> ProfileInterface:
+    """
+    @return a connection to a profile, like ProfileConnectionFactory.create, that is shared with
+            all sessions of this process through the profile registry. The connection also has
+            getVersion, polled by the agents, which has changed if the profile changed since the
+            last call.
+    """
+    return PROFILE_REGISTRY.create(uri, reporter)
+
+
+def get_sorted_bid_index(
+    profile: LinearAdditive, precision: Optional[int] = None, limit: int = INDEX_LIMIT
+) -> Optional[SortedBidIndex]:
+    """
+    @param precision precision of the weighted value utilities, see utils.index_cache
+    @return the SortedBidIndex of a profile (see utils.index_cache), None if the domain has more
+            than limit bids
+    """
+    if not within_index_limit(profile, limit):
+        return None
+    return index_cache.get_sorted_bid_index(profile, precision)
@@ -0,0 +1,138 @@
+from typing import List, Optional, Sequence
+
+import numpy as np
+from geniusweb.bidspace.AllBidsList import AllBidsList
+from geniusweb.issuevalue.Bid import Bid
+from geniusweb.issuevalue.Domain import Domain
+
+
+class BidCodec:
+    """
+    Maps the complete bids of a domain to integer ranks and back. The rank of a bid is the
+    mixed-radix number whose digits are the indices of its values (in ValueSet order), with the
+    first issue most significant and the last issue changing fastest.
+
+    With the default issue order (sorted issue names) the ranks are the same in every process and
+    match the bid ranks of CompiledProfile, SortedBidIndex and the trace store. for_all_bids_list
+    gives a codec whose ranks are the indices of AllBidsList in the current process instead.
+
+    Single bids use Python ints, so any domain size works. The batch methods use int64 arrays and
+    need a bid space of less than 2^63 bids.
+    """
+
+    def __init__(self, domain: Domain, issues: Optional[Sequence[str]] = None):
+        """
+        @param domain the domain of the bids
+        @param issues the issues from most to least significant, sorted issue names by default
+        """
+        self._domain = domain
+        self._issues: List[str] = sorted(domain.getIssues()) if issues is None else list(issues)
+        assert sorted(self._issues) == sorted(domain.getIssues()), "issues must be the issues of the domain"
+        self._values = [list(domain.getValues(issue)) for issue in self._issues]
+        self._value_index = [{value: index for index, value in enumerate(values)} for values in self._values]
+        self._dims = tuple(len(values) for values in self._values)
+
+        self._size = 1
+        for dim in self._dims:
+            self._size *= dim
+        # weight of every digit in the rank
+        self._strides = []
+        stride = 1
+        for dim in reversed(self._dims):
+            self._strides.insert(0, stride)
+            stride *= dim
+
+    @staticmethod
+    def for_all_bids_list(domain: Domain) -> "BidCodec":
+        """
+        @return a codec with rank(AllBidsList(domain).get(i)) == i. AllBidsList enumerates the
+                issues in the iteration order of domain.getIssues(), which is not the same in
+                every process, so the order is read from an AllBidsList of this process.
+        """
+        all_bids = AllBidsList(domain)
+        first = all_bids.get(0)
+        fastest_first = []
+        stride = 1
+        while stride < all_bids.size():
+            bid = all_bids.get(stride)
+            changed = [issue for issue in domain.getIssues() if bid.getValue(issue) != first.getValue(issue)]
+            assert len(changed) == 1, "AllBidsList is not a mixed-radix enumeration"
+            fastest_first.append(changed[0])
+            stride *= domain.getValues(changed[0]).size()
+        # issues with a single value do not change the rank, put them first
+        constant = sorted(set(domain.getIssues()) - set(fastest_first))
+        return BidCodec(domain, constant + fastest_first[::-1])
+
+    def get_domain(self) -> Domain:
+        return self._domain
+
+    def get_issues(self) -> List[str]:
+        """@return the issues from most to least significant"""
+        return list(self._issues)
+
+    def get_values(self) -> List[list]:
+        """@return the values of every issue, in the order of get_issues"""
+        return [list(values) for values in self._values]
+
+    def get_space_size(self) -> int:
+        """@return the number of bids in the domain"""
+        return self._size
+
+    def value_indices(self, bid: Bid) -> List[int]:
+        """@return the index of the value of every issue of a bid, -1 for issues without (known) value"""
+        return [index.get(bid.getValue(issue), -1) for issue, index in zip(self._issues, self._value_index)]
+
+    def encode(self, bid: Bid) -> int:
+        """@return the rank of a complete bid"""
+        digits = self.value_indices(bid)
+        if -1 in digits:
+            raise ValueError(f"bid {bid} is not a complete bid of domain {self._domain.getName()}")
+        return sum(digit * stride for digit, stride in zip(digits, self._strides))
+
+    def decode(self, rank: int) -> Bid:
+        """@return the bid with a rank in [0, get_space_size())"""
+        if not 0 <= rank < self._size:
+            raise IndexError(f"rank {rank} out of range")
+        issuevalues = {}
+        for issue, values, stride in zip(self._issues, self._values, self._strides):
+            digit, rank = divmod(rank, stride)
+            issuevalues[issue] = values[digit]
+        return Bid(issuevalues)
+
+    def encode_digits(self, bids: Sequence[Bid]) -> np.ndarray:
+        """@return array of shape (len(bids), number of issues) with the value indices of the bids, -1 if missing"""
+        digits = np.full((len(bids), len(self._issues)), -1, dtype=np.int64)
+        for n, bid in enumerate(bids):
+            digits[n] = self.value_indices(bid)
+        return digits
+
+    def to_ranks(self, digits: np.ndarray) -> np.ndarray:
+        """@return the ranks of an array of value-index vectors (one per row)"""
+        self._check_batch()
+        return np.ravel_multi_index(tuple(np.moveaxis(digits, -1, 0)), self._dims)
+
+    def to_digits(self, ranks: np.ndarray) -> np.ndarray:
+        """@return array of shape (len(ranks), number of issues) with the value-index vectors of the ranks"""
+        self._check_batch()
+        return np.stack(np.unravel_index(ranks, self._dims), axis=-1)
+
+    def encode_batch(self, bids: Sequence[Bid]) -> np.ndarray:
+        """@return the ranks of complete bids as int64 array"""
+        digits = self.encode_digits(bids)
+        if (digits < 0).any():
+            raise ValueError("all bids must be complete bids of the domain")
+        return self.to_ranks(digits)
+
+    def decode_batch(self, ranks: np.ndarray) -> List[Bid]:
+        """@return the bids of an array of ranks"""
+        return [
+            Bid({issue: values[index] for issue, values, index in zip(self._issues, self._values, row)})
+            for row in self.to_digits(np.asarray(ranks, dtype=np.int64)).tolist()
+        ]
+
+    def same_encoding(self, other: "BidCodec") -> bool:
+        """@return True iff both codecs give every bid the same rank"""
+        return self._issues == other._issues and self._values == other._values
+
+    def _check_batch(self):
+        assert self._size < 2 ** 63, "batch encoding needs a bid space of less than 2^63 bids"
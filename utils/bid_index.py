@@ -0,0 +1,163 @@
+from decimal import Decimal
+from typing import Optional, Tuple
+
+import numpy as np
+from geniusweb.issuevalue.Bid import Bid
+from geniusweb.profile.utilityspace.LinearAdditive import LinearAdditive
+from tudelft.utilities.immutablelist.AbstractImmutableList import AbstractImmutableList
+
+from utils.bid_codec import BidCodec
+from utils.compiled_profile import UTILITY_TOLERANCE, CompiledProfile
+
+# number of bids that are evaluated at once while building the index
+CHUNK_SIZE = 1 << 20
+# default maximum number of bids in a domain for which an index is built (16 bytes per bid)
+INDEX_LIMIT = 5000000
+
+
+def within_index_limit(profile: LinearAdditive, limit: int = INDEX_LIMIT) -> bool:
+    """@return whether the domain of a profile has at most limit bids"""
+    return BidCodec(profile.getDomain()).get_space_size() <= limit
+
+
+class SortedBidIndex:
+    """
+    All bids of a domain sorted on their utility for a linear additive profile. The bids are
+    held as ranks of the BidCodec of a CompiledProfile, so a utility interval query is two
+    binary searches and the result is a slice of the rank array.
+
+    The sort uses float utilities, bids whose float utilities are within UTILITY_TOLERANCE of each
+    other are sorted on their exact utility. Bids within UTILITY_TOLERANCE of an interval bound are checked
+    against the exact Decimal utility (see CompiledProfile.get_exact_utility), so the result is
+    exactly the set of bids with profile.getUtility(bid) inside the interval, or with the rounded
+    utility of BidsWithUtility for a compiled profile with precision.
+    """
+
+    def __init__(
+        self,
+        profile: LinearAdditive,
+        compiled: Optional[CompiledProfile] = None,
+        arrays: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+    ):
+        """
+        @param profile  the profile to index
+        @param compiled the compiled profile, compiled from profile by default
+        @param arrays   the ranks and utilities of an index of the profile that was built before
+                        (see get_arrays), used as they are instead of computing them
+        """
+        self._profile = profile
+        self._compiled = CompiledProfile(profile) if compiled is None else compiled
+        if arrays is not None:
+            self._ranks, self._utilities = arrays
+            return
+
+        size = self._compiled.get_space_size()
+        utilities = np.empty(size)
+        for start in range(0, size, CHUNK_SIZE):
+            stop = min(start + CHUNK_SIZE, size)
+            chunk = np.arange(start, stop, dtype=np.int64)
+            utilities[start:stop] = self._compiled.utilities(self._compiled.decode_ranks(chunk))
+        ranks = np.argsort(utilities, kind="stable")
+        self._ranks = self._sort_close(ranks, utilities[ranks])
+        self._utilities = utilities[self._ranks]
+
+    def _sort_close(self, ranks: np.ndarray, utilities: np.ndarray) -> np.ndarray:
+        """
+        @param ranks     the ranks of all bids sorted on float utility
+        @param utilities the float utilities of the ranks
+        @return the ranks, with every run of bids whose float utilities are too close to tell them
+                apart sorted on exact utility, so the exact utilities are sorted as well
+        """
+        close = np.diff(utilities) <= UTILITY_TOLERANCE
+        members = np.zeros(len(ranks), dtype=bool)
+        members[:-1] |= close
+        members[1:] |= close
+        positions = np.flatnonzero(members)
+        if len(positions) == 0:
+            return ranks
+        run = np.cumsum(np.concatenate(([True], ~close)))[positions]
+        chunks = [
+            self._compiled.exact_keys(self._compiled.decode_ranks(ranks[positions[start : start + CHUNK_SIZE]]))
+            for start in range(0, len(positions), CHUNK_SIZE)
+        ]
+        keys = [np.concatenate(limb) for limb in zip(*chunks)]
+        ranks = ranks.copy()
+        ranks[positions] = ranks[positions][np.lexsort(keys + [run])]
+        return ranks
+
+    def size(self) -> int:
+        return len(self._ranks)
+
+    def get_compiled(self) -> CompiledProfile:
+        return self._compiled
+
+    def get_arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        """@return the ranks of the bids sorted on utility and their utilities"""
+        return self._ranks, self._utilities
+
+    def get_bid(self, position: int) -> Bid:
+        """@return the bid at a position in the sorted index, 0 has the lowest utility"""
+        rank = self._ranks[position : position + 1]
+        return self._compiled.decode(self._compiled.decode_ranks(rank)[0])
+
+    def get_rank(self, position: int) -> int:
+        """@return the rank (see BidCodec) of the bid at a position in the sorted index"""
+        return int(self._ranks[position])
+
+    def bounds(self, low: Decimal, high: Decimal) -> Tuple[int, int]:
+        """@return positions [start, stop) of the bids with utility in [low, high]"""
+        start = int(np.searchsorted(self._utilities, float(low) - UTILITY_TOLERANCE, "left"))
+        stop = int(np.searchsorted(self._utilities, float(high) + UTILITY_TOLERANCE, "right"))
+        # resolve the bids whose float utility is too close to a bound with the exact utility
+        while start < stop and self._utilities[start] <= float(low) + UTILITY_TOLERANCE:
+            if self._compiled.get_exact_utility(self.get_bid(start)) >= low:
+                break
+            start += 1
+        while stop > start and self._utilities[stop - 1] >= float(high) - UTILITY_TOLERANCE:
+            if self._compiled.get_exact_utility(self.get_bid(stop - 1)) <= high:
+                break
+            stop -= 1
+        return start, stop
+
+    def position_above(self, threshold: Decimal, strict: bool = True) -> int:
+        """
+        @param threshold the utility threshold
+        @param strict    whether bids with utility equal to the threshold are excluded
+        @return the first position of the bids with utility above the threshold
+        """
+        position = int(np.searchsorted(self._utilities, float(threshold) - UTILITY_TOLERANCE, "left"))
+        stop = int(np.searchsorted(self._utilities, float(threshold) + UTILITY_TOLERANCE, "right"))
+        # resolve the bids whose float utility is too close to the threshold with the exact utility
+        while position < stop:
+            utility = self._compiled.get_exact_utility(self.get_bid(position))
+            if utility > threshold or (utility == threshold and not strict):
+                break
+            position += 1
+        return position
+
+    def count(self, low: Decimal, high: Decimal) -> int:
+        """@return the number of bids with utility in [low, high]"""
+        start, stop = self.bounds(low, high)
+        return stop - start
+
+    def get_bids(self, low: Decimal, high: Decimal) -> "IndexedBidList":
+        """@return the bids with utility in [low, high], ordered on utility"""
+        start, stop = self.bounds(low, high)
+        return IndexedBidList(self, start, stop)
+
+
+class IndexedBidList(AbstractImmutableList[Bid]):
+    """Immutable view on a slice of a SortedBidIndex, bids are only created when requested."""
+
+    def __init__(self, index: SortedBidIndex, start: int, stop: int):
+        self._index = index
+        self._start = start
+        self._stop = stop
+
+    def get(self, index: int) -> Bid:
+        if not 0 <= index < self.size():
+            raise IndexError(f"index {index} out of range")
+        return self._index.get_bid(self._start + index)
+
+    def size(self) -> int:
+        return self._stop - self._start
@@ -0,0 +1,65 @@
+from random import randint
+from typing import Dict, Optional
+
+from geniusweb.issuevalue.Bid import Bid
+from geniusweb.profile.utilityspace.LinearAdditive import LinearAdditive
+
+from utils.bid_index import INDEX_LIMIT, SortedBidIndex, within_index_limit
+from utils.index_cache import get_sorted_bid_index
+from utils.profile_registry import PROFILE_REGISTRY
+
+
+class BidSampler:
+    """
+    Draws bids uniformly at random from the bids above a utility threshold, without rejection
+    sampling. The bids above a threshold are a suffix of a SortedBidIndex, so after a binary
+    search (cached per threshold) every draw is a single random position. If no bid lies above
+    the threshold this is reported exactly by returning None.
+
+    Random numbers come from the random module, so seeding it makes the draws reproducible.
+    """
+
+    def __init__(self, index: SortedBidIndex):
+        self._index = index
+        self._positions: Dict[tuple, int] = {}
+
+    def count_above(self, threshold, strict: bool = True) -> int:
+        """@return the number of bids with utility above (or at, if not strict) the threshold"""
+        return self._index.size() - self._position(threshold, strict)
+
+    def sample_above(self, threshold, strict: bool = True) -> Optional[Bid]:
+        """
+        @param threshold the utility threshold (Decimal or float, compared exactly)
+        @param strict    whether bids with utility equal to the threshold are excluded
+        @return a uniformly drawn bid with utility above the threshold, None if there is none
+        """
+        position = self._position(threshold, strict)
+        if position >= self._index.size():
+            return None
+        return self._index.get_bid(randint(position, self._index.size() - 1))
+
+    def sample(self) -> Bid:
+        """@return a uniformly drawn bid from the whole domain"""
+        return self._index.get_bid(randint(0, self._index.size() - 1))
+
+    def _position(self, threshold, strict: bool) -> int:
+        key = (threshold, strict)
+        if key not in self._positions:
+            self._positions[key] = self._index.position_above(threshold, strict)
+        return self._positions[key]
+
+
+def get_bid_sampler(profile: LinearAdditive, limit: int = INDEX_LIMIT) -> Optional[BidSampler]:
+    """
+    @param profile the profile to sample bids for
+    @param limit   the maximum number of bids in the domain
+    @return the sampler of the profile, shared through the profile registry, or None if the
+            domain has more than limit bids
+    """
+    if not within_index_limit(profile, limit):
+        return None
+    return PROFILE_REGISTRY.get_derived(
+        profile,
+        "bid_sampler",
+        lambda p: BidSampler(get_sorted_bid_index(p)),
+    )
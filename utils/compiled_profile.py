@@ -0,0 +1,203 @@
+from decimal import Decimal
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from geniusweb.bidspace.BidsWithUtility import BidsWithUtility
+from geniusweb.issuevalue.Bid import Bid
+from geniusweb.profile.utilityspace.LinearAdditive import LinearAdditive
+
+from utils.bid_codec import BidCodec
+
+# Maximum absolute difference between the float utilities computed here and the Decimal utilities of
+# LinearAdditiveUtilitySpace.getUtility (converted to float). Every weighted value utility is the float
+# of the exact Decimal product, so the only error is float rounding in the sum over the issues, which is
+# in the order of (number of issues) * 1e-16.
+UTILITY_TOLERANCE = 1e-12
+# exact utilities (see exact_keys) are integers split in limbs of this many decimal digits, so the sum of
+# a limb over up to 92 issues fits in an int64
+LIMB_DIGITS = 17
+LIMB_BASE = 10 ** LIMB_DIGITS
+
+
+class CompiledProfile:
+    """
+    Float representation of a linear additive profile for vectorized utility evaluation.
+
+    The weighted utility of value j of issue i is stored in table[i, j]. A bid is encoded as
+    a vector with the index of its value for every issue, -1 if the bid has no (known) value
+    for that issue. Index -1 refers to the last column of the table which is always 0, so the
+    utility of encoded bids is a single fancy-indexing operation followed by a sum. The vectors
+    are the digits of the bid ranks of get_codec().
+
+    With a precision the weighted value utilities are the rounded ones of BidsWithUtility (which
+    uses precision 6 by default), and the utility of a bid is the sum of the rounded values.
+    """
+
+    def __init__(
+        self, profile: LinearAdditive, issues: Optional[Sequence[str]] = None, precision: Optional[int] = None
+    ):
+        """
+        @param profile   the profile to compile
+        @param issues    the issue order of the encoded bids, sorted issue names by default
+        @param precision precision of the weighted value utilities in BidsWithUtility, None for no rounding
+        """
+        domain = profile.getDomain()
+        weights = profile.getWeights()
+        utilities = profile.getUtilities()
+
+        self._profile = profile
+        self._precision = precision
+        self._codec = BidCodec(domain, issues)
+        self._issues: List[str] = self._codec.get_issues()
+        self._values = self._codec.get_values()
+
+        width = max([len(values) for values in self._values], default=0) + 1
+        self._table = np.zeros((len(self._issues), width))
+        # the rounded weighted utilities per issue, only kept with a precision
+        self._rounded: List[Dict] = []
+        if precision is not None:
+            infos = {info.getName(): info for info in BidsWithUtility.create(profile, precision).getInfo()}
+        exact: List[List[Decimal]] = []
+        for i, (issue, values) in enumerate(zip(self._issues, self._values)):
+            rounded = {}
+            exact.append([])
+            for j, value in enumerate(values):
+                if precision is None:
+                    utility = weights[issue] * utilities[issue].getUtility(value)
+                else:
+                    utility = rounded[value] = infos[issue].getWeightedUtil(value)
+                self._table[i, j] = float(utility)
+                exact[i].append(utility)
+            self._rounded.append(rounded)
+        self._issue_range = np.arange(len(self._issues))
+        self._limbs = _limb_tables(exact, width)
+
+    def get_codec(self) -> BidCodec:
+        """@return the codec of the bid ranks used by this profile"""
+        return self._codec
+
+    def get_issues(self) -> List[str]:
+        return list(self._issues)
+
+    def get_values(self) -> List[list]:
+        """@return the values of every issue, in the order of get_issues"""
+        return [list(values) for values in self._values]
+
+    def get_precision(self) -> Optional[int]:
+        """@return the precision of the weighted value utilities, None if they are not rounded"""
+        return self._precision
+
+    def get_space_size(self) -> int:
+        """@return the number of bids in the domain"""
+        return self._codec.get_space_size()
+
+    def get_issue_utilities(self, issue_index: int) -> np.ndarray:
+        """@return the weighted utilities of the values of an issue, in the order of get_values"""
+        return self._table[issue_index, : len(self._values[issue_index])].copy()
+
+    def decode_ranks(self, ranks: np.ndarray) -> np.ndarray:
+        """
+        Enumerates the bid space: bid rank r is the mixed-radix number whose digits are the
+        value indices, with the last issue changing fastest.
+
+        @param ranks array of bid ranks in [0, get_space_size())
+        @return array of shape (len(ranks), number of issues) with the value-index vectors
+        """
+        return self._codec.to_digits(ranks)
+
+    def decode(self, codes: np.ndarray) -> Bid:
+        """@return the bid of a value-index vector, issues with index -1 are left out"""
+        return Bid(
+            {
+                issue: values[index]
+                for issue, values, index in zip(self._issues, self._values, codes.tolist())
+                if index >= 0
+            }
+        )
+
+    def encode(self, bid: Bid) -> np.ndarray:
+        """@return the value-index vector of a bid"""
+        return np.array(self._codec.value_indices(bid), dtype=np.int64)
+
+    def encode_bids(self, bids: Sequence[Bid]) -> np.ndarray:
+        """@return array of shape (len(bids), number of issues) with the value-index vectors of the bids"""
+        return self._codec.encode_digits(bids)
+
+    def utilities(self, codes: np.ndarray) -> np.ndarray:
+        """@return the utility of every encoded bid (one bid per row of codes)"""
+        return self._table[self._issue_range, codes].sum(axis=-1)
+
+    def get_utility(self, bid: Bid) -> float:
+        return float(self.utilities(self.encode(bid)))
+
+    def get_exact_utility(self, bid: Bid) -> Decimal:
+        """@return the Decimal utility of a bid, the sum of the rounded weighted utilities with a precision"""
+        if self._precision is None:
+            return self._profile.getUtility(bid)
+        return sum(
+            (rounded.get(bid.getValue(issue), Decimal(0)) for issue, rounded in zip(self._issues, self._rounded)),
+            Decimal(0),
+        )
+
+    def exact_keys(self, codes: np.ndarray) -> List[np.ndarray]:
+        """
+        @return the exact utility of every encoded bid (one bid per row of codes) as an integer
+                (the weighted utilities scaled to whole numbers) in int64 limbs of LIMB_DIGITS digits,
+                least significant limb first, so np.lexsort(keys) sorts the bids on exact utility
+        """
+        keys = [table[self._issue_range, codes].sum(axis=-1) for table in self._limbs]
+        for j in range(len(keys) - 1):
+            carry = keys[j] // LIMB_BASE
+            keys[j] = keys[j] - carry * LIMB_BASE
+            keys[j + 1] = keys[j + 1] + carry
+        return keys
+
+    def same_encoding(self, other: "CompiledProfile") -> bool:
+        """@return True iff bids encoded by this profile can be scored by the other profile"""
+        return self._codec.same_encoding(other._codec)
+
+
+def _limb_tables(exact: List[List[Decimal]], width: int) -> List[np.ndarray]:
+    """@return the limb tables of exact_keys for the exact weighted utilities of every issue and value"""
+    assert len(exact) <= 92, "exact utilities support at most 92 issues"
+    places = max([-utility.as_tuple().exponent for values in exact for utility in values] + [0])
+    integers = []
+    for values in exact:
+        integers.append([])
+        for utility in values:
+            assert utility >= 0, "weighted utilities must be non-negative"
+            _, digits, exponent = utility.as_tuple()
+            integers[-1].append(int("".join(map(str, digits))) * 10 ** (exponent + places))
+    total = sum(max(values, default=0) for values in integers)
+    num_limbs = 1
+    while LIMB_BASE ** num_limbs <= total:
+        num_limbs += 1
+
+    tables = [np.zeros((len(exact), width), dtype=np.int64) for _ in range(num_limbs)]
+    for i, values in enumerate(integers):
+        for j, integer in enumerate(values):
+            for table in tables:
+                integer, table[i, j] = divmod(integer, LIMB_BASE)
+    return tables
+
+
+def batch_utilities(profiles: Dict[str, CompiledProfile], bids: Sequence[Bid]) -> Dict[str, np.ndarray]:
+    """
+    Computes the utility of all bids for all profiles. Bids are encoded once for all profiles
+    over the same domain.
+
+    @param profiles compiled profile per party
+    @param bids     the bids to score
+    @return the utilities of the bids per party
+    """
+    results = {}
+    encoded = []
+    for party, profile in profiles.items():
+        for other, codes in encoded:
+            if profile.same_encoding(other):
+                break
+        else:
+            codes = profile.encode_bids(bids)
+            encoded.append((profile, codes))
+        results[party] = profile.utilities(codes)
+    return results
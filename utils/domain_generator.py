@@ -0,0 +1,140 @@
+import json
+import math
+import os
+import random
+from decimal import Decimal
+from typing import List, Tuple, Union
+
+# number of decimals of the weights and utilities, as in the shipped profiles
+DECIMALS = 5
+
+
+def generate_domain(
+    name: str,
+    values_per_issue: List[int],
+    weight_skew: float = 0.5,
+    opposition: float = 0.5,
+    seed: int = 0,
+) -> Tuple[dict, dict, dict]:
+    """
+    Generates a random domain and a pair of linear additive profiles over it in the schema of
+    domains/domainXX. Like the shipped profiles every issue has a value with utility 1.0 and the
+    weights sum to exactly 1 with 5 decimals.
+
+    @param name             name of the domain
+    @param values_per_issue number of values of every issue, the bid space has their product as size
+    @param weight_skew      standard deviation of the log of the issue weights, 0 gives equal weights
+                            and higher values concentrate the weight on fewer issues
+    @param opposition       0 draws the utilities of both profiles independently, 1 makes profile B
+                            the mirror of profile A (every value good for A is bad for B)
+    @param seed             seed of the random generator, equal arguments give equal files
+    @return the domain, profile A and profile B as JSON dicts
+    """
+    assert all(n > 0 for n in values_per_issue), "every issue needs at least one value"
+    assert weight_skew >= 0, "weight_skew must be non-negative"
+    assert 0 <= opposition <= 1, "opposition must be in [0, 1]"
+    rng = random.Random(seed)
+
+    issues = {
+        f"issue{_letters(i)}": [f"value{_letters(v)}" for v in range(num_values)]
+        for i, num_values in enumerate(values_per_issue)
+    }
+    domain = {"name": name, "issuesValues": {issue: {"values": values} for issue, values in issues.items()}}
+
+    utilities_a = {issue: [rng.random() for _ in values] for issue, values in issues.items()}
+    utilities_b = {
+        issue: [(1 - opposition) * rng.random() + opposition * (1 - u) for u in utilities]
+        for issue, utilities in utilities_a.items()
+    }
+    weights_a = [math.exp(rng.gauss(0, weight_skew)) for _ in issues]
+    weights_b = [math.exp(rng.gauss(0, weight_skew)) for _ in issues]
+
+    def profile(profile_name: str, utilities: dict, weights: List[float]) -> dict:
+        return {
+            "LinearAdditiveUtilitySpace": {
+                "issueUtilities": {
+                    issue: {
+                        "DiscreteValueSetUtilities": {
+                            "valueUtilities": dict(zip(issues[issue], _normalize_utilities(utilities[issue])))
+                        }
+                    }
+                    for issue in issues
+                },
+                "issueWeights": dict(zip(issues, _normalize_weights(weights))),
+                "domain": domain,
+                "name": profile_name,
+            }
+        }
+
+    return domain, profile("profileA", utilities_a, weights_a), profile("profileB", utilities_b, weights_b)
+
+
+def write_domain(
+    directory: str,
+    values_per_issue: List[int],
+    weight_skew: float = 0.5,
+    opposition: float = 0.5,
+    seed: int = 0,
+) -> List[str]:
+    """
+    Generates a domain with generate_domain and writes it as <name>.json, profileA.json and
+    profileB.json to a directory, the name of the domain is the name of the directory.
+
+    @return the paths of profile A and profile B, ready for the profile_sets of a tournament
+    """
+    os.makedirs(directory, exist_ok=True)
+    name = os.path.basename(os.path.normpath(directory))
+    domain, profile_a, profile_b = generate_domain(name, values_per_issue, weight_skew, opposition, seed)
+
+    for file_name, data in [(f"{name}.json", domain), ("profileA.json", profile_a), ("profileB.json", profile_b)]:
+        with open(os.path.join(directory, file_name), "w") as f:
+            f.write(json.dumps(data, indent=2))
+    return [os.path.join(directory, "profileA.json"), os.path.join(directory, "profileB.json")]
+
+
+def values_for_size(num_bids: int, values_per_issue: int = 10) -> List[int]:
+    """@return values per issue for a bid space of at least num_bids bids with at most values_per_issue values per issue"""
+    issues = []
+    size = 1
+    while size < num_bids:
+        num_values = min(values_per_issue, -(-num_bids // size))
+        issues.append(num_values)
+        size *= num_values
+    return issues or [1]
+
+
+def _normalize_utilities(utilities: List[float]) -> List[float]:
+    """Scales the utilities of an issue so that the best value has utility 1.0 and rounds them."""
+    best = max(utilities)
+    return [1.0 if u == best else round(u / best, DECIMALS) for u in utilities]
+
+
+def _normalize_weights(weights: List[Union[float, int]]) -> List[float]:
+    """
+    Scales the weights to sum 1 and rounds them to DECIMALS decimals with the largest remainder
+    method, so the rounded weights still sum to exactly 1 and every weight is positive.
+    """
+    units = 10 ** DECIMALS
+    assert len(weights) <= units, f"at most {units} issues are supported"
+    total = sum(weights)
+    exact = [w / total * units for w in weights]
+    rounded = [max(1, int(e)) for e in exact]
+    # hand out the units that are left to the largest remainders, take surplus from the largest weights
+    order = sorted(range(len(weights)), key=lambda i: exact[i] - int(exact[i]), reverse=True)
+    i = 0
+    while sum(rounded) < units:
+        rounded[order[i % len(order)]] += 1
+        i += 1
+    while sum(rounded) > units:
+        rounded[rounded.index(max(rounded))] -= 1
+    return [float(Decimal(r) / units) for r in rounded]
+
+
+def _letters(index: int) -> str:
+    """@return A, B, ..., Z, AA, AB, ... for index 0, 1, ..., 25, 26, 27, ..."""
+    letters = ""
+    index += 1
+    while index > 0:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(ord("A") + remainder) + letters
+    return letters
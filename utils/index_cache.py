@@ -0,0 +1,140 @@
+import json
+import os
+import shutil
+import tempfile
+from typing import Optional
+
+import numpy as np
+from geniusweb.profile.utilityspace.LinearAdditive import LinearAdditive
+
+from utils.bid_index import SortedBidIndex
+from utils.compiled_profile import UTILITY_TOLERANCE, CompiledProfile
+from utils.profile_registry import PROFILE_REGISTRY
+
+# version of the layout of a cache entry
+FORMAT_VERSION = 2
+
+# directory of the on-disk index cache of this process, None disables it
+_cache_dir: Optional[str] = None
+
+
+def set_index_cache_dir(cache_dir: Optional[str]):
+    """
+    Enables the on-disk cache of bid indexes for this process, None disables it. Module level
+    function so it can be the initializer of the worker processes of a tournament.
+    """
+    global _cache_dir
+    _cache_dir = cache_dir
+
+
+def get_index_cache_dir() -> Optional[str]:
+    return _cache_dir
+
+
+def get_sorted_bid_index(profile: LinearAdditive, precision: Optional[int] = None) -> SortedBidIndex:
+    """
+    @param profile   the profile to index
+    @param precision index the utilities of BidsWithUtility with this precision, None for the
+                     exact utilities of the profile (see CompiledProfile)
+    @return the SortedBidIndex of a profile, shared through the profile registry. If the on-disk
+            cache is enabled and the profile came from the registry, the index is memory-mapped
+            from the cache when it was built before (in any process) and stored there otherwise.
+    """
+    suffix = "" if precision is None else f"_p{precision}"
+    return PROFILE_REGISTRY.get_derived(
+        profile, "sorted_bid_index" + suffix, lambda p: _create_index(p, precision)
+    )
+
+
+def _create_index(profile: LinearAdditive, precision: Optional[int]) -> SortedBidIndex:
+    if precision is None:
+        compiled = PROFILE_REGISTRY.get_derived(profile, "compiled_profile", CompiledProfile)
+    else:
+        compiled = PROFILE_REGISTRY.get_derived(
+            profile, f"compiled_profile_p{precision}", lambda p: CompiledProfile(p, precision=precision)
+        )
+    sha256 = PROFILE_REGISTRY.get_profile_hash(profile)
+    if _cache_dir is None or sha256 is None:
+        return SortedBidIndex(profile, compiled)
+
+    entry = os.path.join(_cache_dir, sha256 if precision is None else f"{sha256}-p{precision}")
+    index = load_index(entry, profile, compiled, sha256)
+    if index is None:
+        index = SortedBidIndex(profile, compiled)
+        store_index(entry, index, sha256)
+    return index
+
+
+def store_index(entry: str, index: SortedBidIndex, sha256: str):
+    """
+    Writes an index to a cache entry directory: the sorted ranks and utilities as .npy files and
+    a meta.json that identifies the profile, the domain and the precision of the utilities. The entry is written to a temporary
+    directory first and then renamed, so other processes never see a partial entry. If another
+    process stored the same entry in the meantime, that one is kept.
+    """
+    compiled = index.get_compiled()
+    ranks, utilities = index.get_arrays()
+    parent = os.path.dirname(entry) or "."
+    os.makedirs(parent, exist_ok=True)
+    tmp = tempfile.mkdtemp(dir=parent, prefix=".tmp-")
+    try:
+        np.save(os.path.join(tmp, "ranks.npy"), ranks)
+        np.save(os.path.join(tmp, "utilities.npy"), utilities)
+        meta = {
+            "format_version": FORMAT_VERSION,
+            "sha256": sha256,
+            "issues": compiled.get_issues(),
+            "dims": [len(values) for values in compiled.get_values()],
+            "size": index.size(),
+            "precision": compiled.get_precision(),
+            "min_utility": float(utilities[0]) if len(utilities) else None,
+            "max_utility": float(utilities[-1]) if len(utilities) else None,
+        }
+        with open(os.path.join(tmp, "meta.json"), "w") as f:
+            f.write(json.dumps(meta))
+        os.rename(tmp, entry)
+    except OSError:
+        # the entry exists already (written by another process) or the cache is not writable
+        pass
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def load_index(
+    entry: str, profile: LinearAdditive, compiled: CompiledProfile, sha256: str
+) -> Optional[SortedBidIndex]:
+    """
+    @return the index in a cache entry directory with memory-mapped arrays, None if there is no
+            valid entry: the hash, domain and array shapes must match and the first and last
+            utility must be the minimum and maximum utility of the profile
+    """
+    try:
+        with open(os.path.join(entry, "meta.json"), "r") as f:
+            meta = json.load(f)
+        ranks = np.load(os.path.join(entry, "ranks.npy"), mmap_mode="r")
+        utilities = np.load(os.path.join(entry, "utilities.npy"), mmap_mode="r")
+    except (OSError, ValueError):
+        return None
+
+    size = compiled.get_space_size()
+    if (
+        meta.get("format_version") != FORMAT_VERSION
+        or meta.get("sha256") != sha256
+        or meta.get("issues") != compiled.get_issues()
+        or meta.get("dims") != [len(values) for values in compiled.get_values()]
+        or meta.get("size") != size
+        or meta.get("precision") != compiled.get_precision()
+        or ranks.shape != (size,)
+        or utilities.shape != (size,)
+        or ranks.dtype != np.int64
+        or utilities.dtype != np.float64
+    ):
+        return None
+    if size:
+        # the extremes of a linear additive profile follow from the best and worst value per issue
+        tables = [compiled.get_issue_utilities(i) for i in range(len(compiled.get_issues()))]
+        low = sum(table.min() for table in tables)
+        high = sum(table.max() for table in tables)
+        if abs(utilities[0] - low) > UTILITY_TOLERANCE or abs(utilities[-1] - high) > UTILITY_TOLERANCE:
+            return None
+    return SortedBidIndex(profile, compiled, (ranks, utilities))
@@ -0,0 +1,143 @@
+from time import perf_counter
+from typing import Dict, List, Optional
+
+import numpy as np
+from geniusweb.inform.YourTurn import YourTurn
+from geniusweb.simplerunner.ClassPathConnectionFactory import \
+    ClassPathConnectionFactory
+from tudelft_utilities_logging.Reporter import Reporter
+
+from utils import watchdog
+
+
+class SessionTimer:
+    """
+    Collects the timing of one negotiation session. Times are in seconds, wall times are
+    relative to the creation of the timer (the start of the session).
+
+    For every action the wall time at which the protocol received it and the think time of the
+    agent (from the YourTurn it was sent until the action arrived) are recorded. Actions are
+    recorded by identity, so they can be found back in the SAOPState afterwards. The turns are
+    also reported to the watchdog of the worker process, if it has one. report_time is the time
+    spent in the reporter of the session, see InstrumentedReporter.
+    """
+
+    def __init__(self):
+        self._start = perf_counter()
+        self._turn_start: Dict[str, float] = {}
+        self._actions: Dict[int, tuple] = {}
+        self.report_time = 0.0
+
+    def elapsed(self) -> float:
+        return perf_counter() - self._start
+
+    def turn_started(self, party: str):
+        self._turn_start[party] = perf_counter()
+        watchdog.turn_started()
+
+    def action_received(self, party: str, action):
+        now = perf_counter()
+        watchdog.turn_ended()
+        turn_start = self._turn_start.pop(party, None)
+        think_time = None if turn_start is None else now - turn_start
+        # the action itself is kept so that its id cannot be reused during the session
+        self._actions[id(action)] = (action, now - self._start, think_time)
+
+    def get_timing(self, action) -> Optional[tuple]:
+        """@return (wall time, think time) of an action, None if it was not recorded"""
+        timing = self._actions.get(id(action))
+        return None if timing is None else timing[1:]
+
+
+class InstrumentedConnectionFactory(ClassPathConnectionFactory):
+    """ClassPathConnectionFactory whose connections report every YourTurn and action to a SessionTimer."""
+
+    def __init__(self, timer: SessionTimer):
+        super().__init__()
+        self._timer = timer
+
+    def connect(self, reference):
+        return self._instrument(super().connect(reference))
+
+    def connectAll(self, references):
+        return [self._instrument(connection) for connection in super().connectAll(references)]
+
+    def _instrument(self, connection):
+        if isinstance(connection, InstrumentedConnection):
+            return connection
+        return InstrumentedConnection(connection, self._timer)
+
+
+class InstrumentedConnection:
+    """
+    Wraps the protocol side of a connection to a party. Everything is passed on to the wrapped
+    connection, the YourTurn messages sent to the party and the actions it sends back are
+    timestamped on the way.
+    """
+
+    def __init__(self, connection, timer: SessionTimer):
+        self._connection = connection
+        self._timer = timer
+        self._listeners: Dict[int, object] = {}
+
+    def send(self, data):
+        if isinstance(data, YourTurn):
+            self._timer.turn_started(self._party())
+        self._connection.send(data)
+
+    def addListener(self, listener):
+        wrapped = _TimedListener(listener, lambda action: self._timer.action_received(self._party(), action))
+        self._listeners[id(listener)] = wrapped
+        self._connection.addListener(wrapped)
+
+    def removeListener(self, listener):
+        self._connection.removeListener(self._listeners.pop(id(listener), listener))
+
+    def _party(self) -> str:
+        return self._connection.getParty().getName()
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+
+class _TimedListener:
+    """Listener that reports an action before passing it on."""
+
+    def __init__(self, listener, on_action):
+        self._listener = listener
+        self._on_action = on_action
+
+    def notifyChange(self, action):
+        self._on_action(action)
+        self._listener.notifyChange(action)
+
+
+class InstrumentedReporter(Reporter):
+    """Passes everything on to another reporter and adds the time spent reporting to a SessionTimer."""
+
+    def __init__(self, reporter: Reporter, timer: SessionTimer):
+        self._reporter = reporter
+        self._timer = timer
+
+    def log(self, level: int, msg: str, exc: Optional[BaseException] = None):
+        start = perf_counter()
+        self._reporter.log(level, msg, exc)
+        self._timer.report_time += perf_counter() - start
+
+
+def latency_summary(think_times: Dict[str, List[float]]) -> dict:
+    """
+    @param think_times the think times of every turn per actor, in the order of the parties of the session
+    @return summary keys latency_p50/p95/max_{position} in seconds per actor
+    """
+    summary = {}
+    for position, times in enumerate(think_times.values(), 1):
+        if times:
+            summary[f"latency_p50_{position}"] = float(np.percentile(times, 50))
+            summary[f"latency_p95_{position}"] = float(np.percentile(times, 95))
+            summary[f"latency_max_{position}"] = float(max(times))
+        else:
+            summary[f"latency_p50_{position}"] = None
+            summary[f"latency_p95_{position}"] = None
+            summary[f"latency_max_{position}"] = None
+    return summary
@@ -0,0 +1,253 @@
+import importlib
+import json
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from geniusweb.actions.Accept import Accept
+from geniusweb.actions.Action import Action
+from geniusweb.actions.EndNegotiation import EndNegotiation
+from geniusweb.actions.Offer import Offer
+from geniusweb.actions.PartyId import PartyId
+from geniusweb.inform.ActionDone import ActionDone
+from geniusweb.inform.Agreements import Agreements
+from geniusweb.inform.Finished import Finished
+from geniusweb.inform.Inform import Inform
+from geniusweb.inform.Settings import Settings
+from geniusweb.inform.YourTurn import YourTurn
+from geniusweb.issuevalue.Bid import Bid
+from geniusweb.issuevalue.DiscreteValue import DiscreteValue
+from geniusweb.party.DefaultParty import DefaultParty
+from geniusweb.progress.ProgressRounds import ProgressRounds
+from geniusweb.references.Parameters import Parameters
+from geniusweb.references.ProfileRef import ProfileRef
+from geniusweb.references.ProtocolRef import ProtocolRef
+from pyson.ObjectMapper import ObjectMapper
+from tudelft_utilities_logging.Reporter import Reporter
+from uri.uri import URI
+
+from utils import virtual_clock
+from utils.instrumentation import SessionTimer
+
+# deadline in wall clock time of a session, as in the settings that run_session gives to NegoRunner. It is
+# read from utils.virtual_clock, so in a session with virtual time it is virtual too
+DURATION_MS = 60000
+
+
+class LocalSAOPState:
+    """
+    Outcome of a local SAOP session, offers the part of the SAOPState interface that the runners
+    use. The trace in the schema of ObjectMapper().toJson(SAOPState) is only built by toJson.
+    """
+
+    def __init__(
+        self,
+        actions: List[Action],
+        agreement: Optional[Bid],
+        error: Optional[str],
+        settings_full: dict,
+        party_profiles: Dict[str, dict],
+        progress: ProgressRounds,
+        endtime: datetime,
+    ):
+        self._actions = actions
+        self._agreement = agreement
+        self._error = error
+        self._settings_full = settings_full
+        self._party_profiles = party_profiles
+        self._progress = progress
+        self._endtime = endtime
+
+    def getActions(self) -> List[Action]:
+        return self._actions
+
+    def getAgreement(self) -> Optional[Bid]:
+        return self._agreement
+
+    def getError(self) -> Optional[str]:
+        return self._error
+
+    def getPartyProfiles(self) -> Dict[str, dict]:
+        """@return the partyprofiles of the trace, {party id: {"party": {"partyref": ...}, "profile": ...}}"""
+        return self._party_profiles
+
+    def toJson(self) -> dict:
+        return {
+            "SAOPState": {
+                "actions": [_action_to_json(action) for action in self._actions],
+                "connections": list(self._party_profiles),
+                "progress": {
+                    "ProgressRounds": {
+                        "duration": self._progress.getTotalRounds(),
+                        "currentRound": self._progress.getCurrentRound(),
+                        "endtime": round(self._endtime.timestamp() * 1000),
+                    }
+                },
+                "settings": self._settings_full,
+                # copies, process_results adds to the trace
+                "partyprofiles": json.loads(json.dumps(self._party_profiles)),
+                "error": self._error,
+            }
+        }
+
+
+class _PartyConnection:
+    """Connection that a party sends its actions over, they are queued until the engine picks them up."""
+
+    def __init__(self, party_id: PartyId):
+        self.party_id = party_id
+        self.outbox: List[Action] = []
+
+    def send(self, action: Action):
+        self.outbox.append(action)
+
+    def addListener(self, listener):
+        pass
+
+    def removeListener(self, listener):
+        pass
+
+    def close(self):
+        pass
+
+
+def run_local_session(
+    settings_full: dict, timer: Optional[SessionTimer] = None, reporter: Optional[Reporter] = None
+) -> LocalSAOPState:
+    """
+    Runs a SAOP session in this process without NegoRunner. The parties are instantiated directly
+    from their classpath and get their Settings, YourTurn, ActionDone and Finished informs in the
+    same order as from the SAOP protocol: the parties take turns in order, a round ends after the
+    last party acted, an Accept of the last offer is an agreement, an EndNegotiation or the
+    deadline (rounds or DURATION_MS) ends the session without one. A party that raises or acts out
+    of turn ends the session with an error, like a protocol error of NegoRunner.
+
+    @param settings_full the settings dict that run_session would give to NegoRunner
+    @param timer         optional SessionTimer that every YourTurn and action is reported to
+    @param reporter      optional reporter that an error of the session is logged to
+    @return the state of the finished session
+    """
+    saop_settings = settings_full["SAOPSettings"]
+    participants = [p["TeamInfo"]["parties"][0] for p in saop_settings["participants"]]
+    rounds = saop_settings["deadline"]["DeadlineRounds"]["rounds"]
+    endtime = datetime.fromtimestamp(virtual_clock.time()) + timedelta(milliseconds=DURATION_MS)
+    progress = ProgressRounds(rounds, 0, endtime)
+
+    parties: List[DefaultParty] = []
+    connections: List[_PartyConnection] = []
+    for serial, participant in enumerate(participants, 1):
+        party_class = _load_class(participant["party"]["partyref"].split(":", 1)[1])
+        party_id = PartyId(f"{party_class.__name__.lower()}_{serial}")
+        party = party_class()
+        connection = _PartyConnection(party_id)
+        party.connect(connection)
+        parties.append(party)
+        connections.append(connection)
+
+    actions: List[Action] = []
+    agreement = None
+    error = None
+
+    def deliver(index: int, info: Inform) -> bool:
+        """Delivers an inform to a party, returns False if the party crashed."""
+        nonlocal error
+        try:
+            parties[index].notifyChange(info)
+        except Exception as e:
+            error = f"party {connections[index].party_id.getName()} failed: {e!r}"
+            return False
+        return True
+
+    for index, participant in enumerate(participants):
+        settings = Settings(
+            connections[index].party_id,
+            ProfileRef(URI(participant["profile"])),
+            ProtocolRef(URI("SAOP")),
+            progress,
+            Parameters(participant["party"]["parameters"]),
+        )
+        if not deliver(index, settings):
+            break
+
+    current = 0
+    last_offer: Optional[Bid] = None
+    while error is None:
+        if timer is not None:
+            timer.turn_started(connections[current].party_id.getName())
+        if not deliver(current, YourTurn()):
+            break
+
+        # exactly one action of the current party is expected after a YourTurn
+        outbox = connections[current].outbox
+        if len(outbox) != 1 or any(c.outbox for c in connections if c is not connections[current]):
+            error = f"party {connections[current].party_id.getName()} did not act exactly once in its turn"
+            break
+        action = outbox.pop()
+        if timer is not None:
+            timer.action_received(connections[current].party_id.getName(), action)
+        if action.getActor() != connections[current].party_id:
+            error = f"party {connections[current].party_id.getName()} acted as {action.getActor()}"
+            break
+        if isinstance(action, Accept) and action.getBid() != last_offer:
+            error = f"party {connections[current].party_id.getName()} accepted a bid that was not offered"
+            break
+        actions.append(action)
+
+        for index in range(len(parties)):
+            if not deliver(index, ActionDone(action)):
+                break
+        if error is not None or isinstance(action, EndNegotiation):
+            break
+        if isinstance(action, Accept):
+            agreement = last_offer
+            break
+        if isinstance(action, Offer):
+            last_offer = action.getBid()
+
+        current = (current + 1) % len(parties)
+        if current == 0:
+            progress = progress.advance()
+        if progress.isPastDeadline(round(virtual_clock.time() * 1000)):
+            break
+
+    if error is not None and reporter is not None:
+        reporter.log(logging.WARNING, f"session ended with error: {error}")
+    agreements = {} if agreement is None else {c.party_id: agreement for c in connections}
+    for index in range(len(parties)):
+        try:
+            parties[index].notifyChange(Finished(Agreements(agreements)))
+        except Exception:
+            # the session is over, a party that fails to terminate does not change the outcome
+            pass
+
+    party_profiles = {c.party_id.getName(): p for c, p in zip(connections, participants)}
+    return LocalSAOPState(actions, agreement, error, settings_full, party_profiles, progress, endtime)
+
+
+_classes: Dict[str, type] = {}
+
+
+def _load_class(classpath: str) -> type:
+    """@return the class at module.path.ClassName, imported once per process"""
+    if classpath not in _classes:
+        module, name = classpath.rsplit(".", 1)
+        _classes[classpath] = getattr(importlib.import_module(module), name)
+    return _classes[classpath]
+
+
+def _action_to_json(action: Action) -> dict:
+    """@return the action as ObjectMapper().toJson would serialize it, without the reflection for the common actions"""
+    if isinstance(action, (Offer, Accept)):
+        values = action.getBid().getIssueValues()
+        return {
+            type(action).__name__: {
+                "actor": action.getActor().getName(),
+                "bid": {
+                    "issuevalues": {
+                        issue: value.getValue() if isinstance(value, DiscreteValue) else ObjectMapper().toJson(value)
+                        for issue, value in values.items()
+                    }
+                },
+            }
+        }
+    return ObjectMapper().toJson(action)
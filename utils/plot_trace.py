@@ -1,8 +1,15 @@
 import os
 from collections import defaultdict
+from typing import Optional, Union
 
+import numpy as np
 import plotly.graph_objects as go
 
+from utils.trace_store import TraceStore
+
+# traces with more actions than this are plotted in fast mode by default
+FAST_THRESHOLD = 2000
+
 def trace_special_points(special_points: list, accept_point: list, agents_involved: list):
     text = []
     x = []
@@ -83,7 +90,28 @@ def trace_special_points(special_points: list, accept_point: list, agents_involv
     fig.update_yaxes(title_text="Utility of {}".format(yaxes_label), range=[0, 1], ticks="outside")
     fig.write_html("results/pareto_plot.html")
 
-def plot_trace(results_trace: dict, plot_file: str):
+def plot_trace(
+    results_trace: Union[dict, TraceStore], plot_file: str, fast: Optional[bool] = None, max_points: int = 2000
+):
+    """
+    Plots the utilities of the offers of a session over the rounds to an HTML file.
+
+    @param results_trace the trace of the session, as dict or as columnar TraceStore
+    @param plot_file     the file to write the plot to
+    @param fast          plot with WebGL, downsampled series and compact hover text, which keeps long
+                         sessions fast to plot and view. By default only for traces of more than
+                         FAST_THRESHOLD actions
+    @param max_points    maximum number of points per series in fast mode
+    """
+    num_actions = len(results_trace) if isinstance(results_trace, TraceStore) else len(results_trace["actions"])
+    if fast is None:
+        fast = num_actions > FAST_THRESHOLD
+    if fast:
+        plot_trace_fast(results_trace, plot_file, max_points)
+        return
+    if isinstance(results_trace, TraceStore):
+        results_trace = results_trace.to_json()
+
     utilities = defaultdict(lambda: defaultdict(lambda: {"x": [], "y": [], "bids": []}))
     accept = {"x": [], "y": [], "bids": []}
     for index, action in enumerate(results_trace["actions"], 1):
@@ -152,3 +180,114 @@ def plot_trace(results_trace: dict, plot_file: str):
     fig.update_xaxes(title_text="round", range=[0, index + 1], ticks="outside")
     fig.update_yaxes(title_text="utility", range=[0, 1], ticks="outside")
     fig.write_html(f"{os.path.splitext(plot_file)[0]}.html")
+
+
+def plot_trace_fast(results_trace: Union[dict, TraceStore], plot_file: str, max_points: int = 2000):
+    """
+    Fast mode of plot_trace. Every series is downsampled to at most max_points points that keep
+    the first and last offer and the lowest and highest utility of every stretch of rounds, so
+    the concession extremes stay visible. The agreement is always plotted. Bids are shown in the
+    hover text through one template per series with only the values stored per point and the
+    figure is drawn with WebGL. Like plot_trace, plotly.js is embedded so the plot works offline.
+
+    A TraceStore is plotted straight from its columns, only the bids of plotted points are decoded.
+    """
+    if isinstance(results_trace, TraceStore):
+        parties = results_trace.get_parties()
+        types = np.asarray(results_trace.columns["type"])
+        offer_type = results_trace.meta["action_types"].index("Offer")
+        accept_type = results_trace.meta["action_types"].index("Accept")
+        is_offer, is_accept = types == offer_type, types == accept_type
+        actors = np.asarray(results_trace.columns["actor"])
+        utilities = np.asarray(results_trace.columns["utilities"])
+        codes = np.asarray(results_trace.columns["bid"])
+        get_bids = lambda indices: results_trace.decode_bids(codes[indices])
+    else:
+        actions = results_trace["actions"]
+        parties = list(results_trace["partyprofiles"])
+        is_offer = np.array(["Offer" in action for action in actions], dtype=bool)
+        is_accept = np.array(["Accept" in action for action in actions], dtype=bool)
+        actors = np.full(len(actions), -1)
+        utilities = np.full((len(actions), len(parties)), np.nan)
+        for i, action in enumerate(actions):
+            if is_offer[i] or is_accept[i]:
+                offer = next(iter(action.values()))
+                actors[i] = parties.index(offer["actor"])
+                utilities[i] = [offer["utilities"][party] for party in parties]
+        get_bids = lambda indices: [next(iter(actions[i].values()))["bid"]["issuevalues"] for i in indices]
+
+    num_actions = len(is_offer)
+    bid_indices = np.flatnonzero(is_offer | is_accept)
+    issues = list(get_bids(bid_indices[:1])[0]) if len(bid_indices) else []
+    hovertemplate = "<b>utility: %{y:.3f}</b><br>" + "<br>".join(
+        f"{issue}: %{{customdata[{i}]}}" for i, issue in enumerate(issues)
+    )
+
+    def customdata(indices: np.ndarray) -> np.ndarray:
+        return np.array([[str(bid[issue]) for issue in issues] for bid in get_bids(indices)], dtype=str)
+
+    # the agreement is plotted in the round of the accepted offer
+    accepts = np.flatnonzero(is_accept)
+    fig = go.Figure()
+    fig.add_trace(
+        go.Scattergl(
+            mode="markers",
+            x=np.repeat(accepts, len(parties)),
+            y=utilities[accepts].ravel(),
+            name="agreement",
+            marker={"color": "green", "size": 15},
+            customdata=customdata(np.repeat(accepts, len(parties))) if len(accepts) else None,
+            hovertemplate=hovertemplate + "<extra>agreement</extra>",
+        )
+    )
+
+    color = {0: "red", 1: "blue"}
+    for i, agent in enumerate(parties):
+        name = "_".join(agent.split("_")[-2:])
+        for a, actor in enumerate(parties):
+            indices = np.flatnonzero(is_offer & (actors == a))
+            if not len(indices):
+                continue
+            indices = indices[_downsample(utilities[indices, i], max_points)]
+            fig.add_trace(
+                go.Scattergl(
+                    mode="lines+markers" if agent == actor else "markers",
+                    x=indices + 1,
+                    y=utilities[indices, i],
+                    name=f"{name} offered" if agent == actor else f"{name} received",
+                    legendgroup=agent,
+                    marker={"color": color[i]},
+                    customdata=customdata(indices),
+                    hovertemplate=hovertemplate + "<extra></extra>",
+                )
+            )
+
+    fig.update_layout(
+        height=800,
+        legend={
+            "yanchor": "bottom",
+            "y": 1,
+            "xanchor": "left",
+            "x": 0,
+        },
+    )
+    fig.update_xaxes(title_text="round", range=[0, num_actions + 1], ticks="outside")
+    fig.update_yaxes(title_text="utility", range=[0, 1], ticks="outside")
+    fig.write_html(f"{os.path.splitext(plot_file)[0]}.html")
+
+
+def _downsample(values: np.ndarray, max_points: int) -> np.ndarray:
+    """
+    @return sorted indices of at most max_points values: the first and the last value and the
+            minimum and maximum of equally sized buckets in between
+    """
+    if len(values) <= max_points:
+        return np.arange(len(values))
+    num_buckets = max(1, (max_points - 2) // 2)
+    buckets = np.array_split(np.arange(1, len(values) - 1), num_buckets)
+    keep = [0, len(values) - 1]
+    for bucket in buckets:
+        if len(bucket):
+            keep.append(bucket[np.argmin(values[bucket])])
+            keep.append(bucket[np.argmax(values[bucket])])
+    return np.unique(keep)
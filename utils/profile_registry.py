@@ -0,0 +1,173 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from geniusweb.profile.Profile import Profile
+from geniusweb.profileconnection.ProfileConnectionFactory import ProfileConnectionFactory
+from geniusweb.profileconnection.ProfileInterface import ProfileInterface
+from pyson.ObjectMapper import ObjectMapper
+from tudelft_utilities_logging.Reporter import Reporter
+from uri.uri import URI
+
+
+class _Entry:
+    def __init__(self, stamp: Tuple[int, int], sha256: str, profile: Profile):
+        # (mtime in ns, size in bytes) of the file when it was parsed
+        self.stamp = stamp
+        # hash of the file contents, identifies the profile across processes and runs
+        self.sha256 = sha256
+        self.profile = profile
+        # structures derived from the profile (compiled profile, bid indexes, ...)
+        self.derived: Dict[str, Any] = {}
+
+
+class ProfileRegistry:
+    """
+    Process-wide cache of parsed profile files, so a profile is parsed once per process
+    instead of once per session per party.
+
+    Entries are keyed by the resolved path of the profile file and are reparsed when the
+    modification time or size of the file changes. At most maxsize profiles are kept, the
+    least recently used one is evicted first. Structures derived from a profile can be cached
+    alongside it through get_derived, they are evicted together with the profile.
+    """
+
+    def __init__(self, maxsize: int = 64):
+        assert maxsize > 0
+        self._maxsize = maxsize
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        # path of the entry holding a profile object, by id of that object
+        self._paths: Dict[int, str] = {}
+        self._lock = threading.RLock()
+
+    def get_profile(self, profile_uri) -> Profile:
+        """@return the parsed profile of a file: URI (str or URI) or a plain file path"""
+        return self._get_entry(_to_path(profile_uri)).profile
+
+    def get_hash(self, profile_uri) -> str:
+        """@return the sha256 hash of the contents of the profile file"""
+        return self._get_entry(_to_path(profile_uri)).sha256
+
+    def get_profile_hash(self, profile: Profile) -> Optional[str]:
+        """@return the sha256 hash of the file of a profile returned by this registry, None for other profiles"""
+        with self._lock:
+            path = self._paths.get(id(profile))
+            entry = self._entries.get(path) if path is not None else None
+            if entry is None or entry.profile is not profile:
+                return None
+            return entry.sha256
+
+    def get_derived(self, profile: Profile, name: str, factory: Callable[[Profile], Any]) -> Any:
+        """
+        @param profile a profile, only cached if it was returned by this registry
+        @param name    name of the derived structure
+        @param factory creates the derived structure from the profile
+        @return the cached structure, created with factory on first use
+        """
+        with self._lock:
+            path = self._paths.get(id(profile))
+            entry = self._entries.get(path) if path is not None else None
+            if entry is None or entry.profile is not profile:
+                return factory(profile)
+            if name not in entry.derived:
+                entry.derived[name] = factory(profile)
+            return entry.derived[name]
+
+    def create(self, uri: URI, reporter: Reporter) -> ProfileInterface:
+        """
+        Drop-in replacement for ProfileConnectionFactory.create. Profiles behind a file: URI
+        are served from the registry, other URIs are passed on to ProfileConnectionFactory.
+        """
+        if not str(uri).startswith("file:"):
+            return VersionedProfile(ProfileConnectionFactory.create(uri, reporter))
+        return VersionedProfile(RegistryProfileConnection(self.get_profile(uri)))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._paths.clear()
+
+    def _get_entry(self, path: str) -> _Entry:
+        stat = os.stat(path)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry.stamp == stamp:
+                self._entries.move_to_end(path)
+                return entry
+
+            with open(path, "rb") as f:
+                data = f.read()
+            profile = ObjectMapper().parse(json.loads(data), Profile)
+            entry = _Entry(stamp, hashlib.sha256(data).hexdigest(), profile)
+
+            self._remove(path)
+            self._entries[path] = entry
+            self._paths[id(profile)] = path
+            while len(self._entries) > self._maxsize:
+                self._remove(next(iter(self._entries)))
+            return entry
+
+    def _remove(self, path: str):
+        entry = self._entries.pop(path, None)
+        if entry is not None:
+            self._paths.pop(id(entry.profile), None)
+
+
+class RegistryProfileConnection(ProfileInterface):
+    """Profile connection that serves a profile from a ProfileRegistry."""
+
+    def __init__(self, profile: Profile):
+        self._profile = profile
+
+    def getProfile(self) -> Profile:
+        return self._profile
+
+    def close(self):
+        pass
+
+
+class VersionedProfile(ProfileInterface):
+    """
+    Profile connection that numbers the profiles of the connection it wraps. The version
+    changes exactly when the wrapped connection returns a different profile object, which
+    is an identity check instead of a deep comparison of two profiles. The handle is polled:
+    a change is only seen on the next getProfile or getVersion.
+    """
+
+    def __init__(self, connection: ProfileInterface):
+        self._connection = connection
+        self._profile: Profile = None  # type:ignore
+        self._version = 0
+
+    def getProfile(self) -> Profile:
+        profile = self._connection.getProfile()
+        if profile is not self._profile:
+            self._profile = profile
+            self._version += 1
+        return profile
+
+    def getVersion(self) -> int:
+        """@return the version of the current profile, starting at 1"""
+        self.getProfile()
+        return self._version
+
+    def close(self):
+        self._connection.close()
+
+
+def _to_path(profile_uri) -> str:
+    """@return the resolved file path of a file: URI (str or URI) or a plain file path"""
+    path = str(profile_uri)
+    if path.startswith("file:"):
+        path = path[len("file:"):]
+        if path.startswith("//"):
+            path = path[len("//"):]
+    return os.path.realpath(path)
+
+
+# registry shared by the runners and the bundled agents of this process
+PROFILE_REGISTRY = ProfileRegistry()
@@ -0,0 +1,155 @@
+import math
+import os
+from contextlib import ExitStack
+from statistics import NormalDist
+from typing import Dict, Iterator, List, Tuple
+
+from utils.ask_proceed import ask_proceed
+from utils.runners import iter_tournament, tournament_pool, tournament_sessions
+
+# default settings of the repetition mode, see run_tournament.py
+DEFAULT_REPETITIONS = {
+    "target_width": 0.1,
+    "rate_target_width": 0.5,
+    "confidence": 0.95,
+    "min_sessions": 5,
+    "max_sessions": 50,
+    "seed": 0,
+}
+
+
+def mean_ci(samples: List[float], confidence: float = 0.95) -> Tuple[float, List[float]]:
+    """@return the mean of the samples and its confidence interval (normal approximation)"""
+    n = len(samples)
+    mean = sum(samples) / n
+    if n < 2:
+        return mean, [-math.inf, math.inf]
+    std = math.sqrt(sum((x - mean) ** 2 for x in samples) / (n - 1))
+    half = NormalDist().inv_cdf(0.5 + confidence / 2) * std / math.sqrt(n)
+    return mean, [mean - half, mean + half]
+
+
+def wilson_ci(successes: int, n: int, confidence: float = 0.95) -> Tuple[float, List[float]]:
+    """@return the rate of successes and its Wilson score interval, which stays sensible at rates of 0 and 1"""
+    rate = successes / n
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    center = (rate + z ** 2 / (2 * n)) / (1 + z ** 2 / n)
+    half = z / (1 + z ** 2 / n) * math.sqrt(rate * (1 - rate) / n + z ** 2 / (4 * n ** 2))
+    return rate, [max(0.0, center - half), min(1.0, center + half)]
+
+
+def summarize_repetitions(summaries: List[dict], confidence: float = 0.95) -> dict:
+    """
+    Aggregates the summaries of the repeated sessions of a pairing.
+
+    @return summary with per agent the mean utility and its confidence interval, the mean nash
+            product and social welfare, the agreement rate with its Wilson interval, the number
+            of sessions n and the number of sessions that ended in an ERROR
+    """
+    names = [v for k, v in summaries[0].items() if k.startswith("agent_")]
+    utilities = [[v for k, v in summary.items() if k.startswith("utility_")] for summary in summaries]
+
+    results_summary = {}
+    for position, name in enumerate(names, 1):
+        mean, ci = mean_ci([utility[position - 1] for utility in utilities], confidence)
+        results_summary[f"agent_{position}"] = name
+        results_summary[f"utility_{position}_mean"] = mean
+        results_summary[f"utility_{position}_ci"] = ci
+    for key in ["nash_product", "social_welfare"]:
+        results_summary[f"{key}_mean"] = sum(summary[key] for summary in summaries) / len(summaries)
+    agreements = sum(summary["result"] == "agreement" for summary in summaries)
+    results_summary["agreement_rate"], results_summary["agreement_rate_ci"] = wilson_ci(
+        agreements, len(summaries), confidence
+    )
+    results_summary["errors"] = sum(summary["result"] == "ERROR" for summary in summaries)
+    results_summary["n"] = len(summaries)
+    return results_summary
+
+
+def sessions_needed(results_summary: dict, target_width: float, rate_target_width: float) -> int:
+    """
+    Estimates the number of sessions after which the confidence intervals on the utilities are
+    at most target_width wide and the one on the agreement rate at most rate_target_width. The
+    width of an interval shrinks with the square root of n, so an interval that is w wide needs
+    n * (w / target) ^ 2 sessions. The Wilson interval of a rate of 0 or 1 is still 0.43 wide
+    after 5 sessions (at 95% confidence), so its target is looser.
+
+    @return the estimated number of sessions, at most n if the intervals are within their targets
+    """
+    n = results_summary["n"]
+    needed = n
+    for key, ci in results_summary.items():
+        if key.endswith("_ci"):
+            target = rate_target_width if key == "agreement_rate_ci" else target_width
+            needed = max(needed, math.ceil(n * ((ci[1] - ci[0]) / target) ** 2))
+    return needed
+
+
+def iter_repeated_tournament(tournament_settings: dict) -> Iterator[Tuple[dict, dict]]:
+    """
+    Runs every pairing of a tournament repeatedly with seeds seed, seed + 1, ... until the
+    confidence intervals on the utilities are at most target_width wide and the one on the
+    agreement rate at most rate_target_width, or max_sessions is reached. All pairings first get
+    min_sessions sessions, after that every batch of sessions only repeats the pairings that did
+    not converge, each as many times as sessions_needed estimates. All batches run on the same
+    worker pool.
+
+    Every session is run (and logged) as a session of the tournament with a "seed" in its
+    settings. Yields the settings of every pairing with its aggregated summary (see
+    summarize_repetitions) plus whether it converged, in the order of the tournament.
+    """
+    options = dict(DEFAULT_REPETITIONS, **tournament_settings["repetitions"])
+    target_width = options["target_width"]
+    rate_target_width = options["rate_target_width"]
+    confidence = options["confidence"]
+    min_sessions = max(2, options["min_sessions"])
+    max_sessions = max(min_sessions, options["max_sessions"])
+
+    pairings = tournament_sessions(tournament_settings)
+    num_sessions = len(pairings) * max_sessions
+    if num_sessions > 100:
+        message = f"WARNING: this could run up to {num_sessions} negotiation sessions. Proceed?"
+        if not ask_proceed(message):
+            print("Exiting script")
+            exit()
+
+    samples: List[List[dict]] = [[] for _ in pairings]
+    wanted: Dict[int, int] = {i: min_sessions for i in range(len(pairings))}
+    batch = 0
+    with ExitStack() as stack:
+        # the warm workers are kept for all batches
+        pool = tournament_pool(tournament_settings, tournament_settings.get("workers", 1))
+        if pool is not None:
+            stack.enter_context(pool)
+        while wanted:
+            sessions, owners = [], []
+            for i, count in wanted.items():
+                first_seed = options["seed"] + len(samples[i])
+                for seed in range(first_seed, first_seed + count):
+                    sessions.append(dict(pairings[i], seed=seed))
+                    owners.append(i)
+
+            # later batches add to the results log of the first, with a log directory per batch
+            batch_settings = dict(tournament_settings)
+            if batch > 0:
+                batch_settings["resume"] = True
+            if tournament_settings.get("log_dir") is not None:
+                batch_settings["log_dir"] = os.path.join(tournament_settings["log_dir"], f"batch_{batch:02d}")
+            results = iter_tournament(batch_settings, sessions, confirm=False, pool=pool)
+            for owner, (_, results_summary) in zip(owners, results):
+                samples[owner].append(results_summary)
+            batch += 1
+
+            wanted = {}
+            for i, summaries in enumerate(samples):
+                n = len(summaries)
+                needed = sessions_needed(summarize_repetitions(summaries, confidence), target_width, rate_target_width)
+                if needed > n and n < max_sessions:
+                    wanted[i] = min(needed, max_sessions) - n
+
+    for pairing, summaries in zip(pairings, samples):
+        results_summary = summarize_repetitions(summaries, confidence)
+        results_summary["converged"] = (
+            sessions_needed(results_summary, target_width, rate_target_width) <= results_summary["n"]
+        )
+        yield pairing, results_summary
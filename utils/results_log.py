@@ -0,0 +1,82 @@
+import json
+import os
+from typing import Dict, Optional
+
+
+def session_key(settings: dict) -> str:
+    """Key that identifies a session in the results log, equal settings give an equal key."""
+    return json.dumps(settings, sort_keys=True)
+
+
+def check_results_log(results_log: str, resume: bool = False, overwrite: bool = False):
+    """Raises FileExistsError if opening a ResultsLog with these arguments would replace a non-empty log."""
+    exists = os.path.exists(results_log) and os.path.getsize(results_log) > 0
+    if exists and not resume and not overwrite:
+        raise FileExistsError(
+            f"results log {results_log} already exists, resume it or allow overwriting it in the settings"
+        )
+
+
+class ResultsLog:
+    """
+    Append-only JSONL file with one finished negotiation session per line:
+    {"settings": {...}, "summary": {...}}
+
+    Every record is flushed to disk as soon as it is written, so an interrupted tournament
+    only loses the sessions that were still running. When opened with resume=True the
+    existing records are kept and indexed by session key (only the byte offset of every
+    line is held in memory), so finished sessions can be skipped and read back later. A
+    non-empty log is only replaced by a new one with overwrite=True.
+    """
+
+    def __init__(self, results_log: str, resume: bool = False, overwrite: bool = False):
+        self._path = results_log
+        self._offsets: Dict[str, int] = {}
+
+        check_results_log(results_log, resume, overwrite)
+        if resume and os.path.exists(results_log) and os.path.getsize(results_log) > 0:
+            self._index()
+            self._file = open(results_log, "a")
+        else:
+            self._file = open(results_log, "w")
+        self._reader = open(results_log, "rb")
+
+    def _index(self):
+        """Stores the offset of every complete record and cuts off a truncated last line."""
+        offset = 0
+        with open(self._path, "rb") as f:
+            for line in iter(f.readline, b""):
+                if not line.endswith(b"\n"):
+                    break
+                record = json.loads(line)
+                self._offsets[session_key(record["settings"])] = offset
+                offset = f.tell()
+        with open(self._path, "rb+") as f:
+            f.truncate(offset)
+
+    def __contains__(self, settings: dict) -> bool:
+        return session_key(settings) in self._offsets
+
+    def get(self, settings: dict) -> Optional[dict]:
+        """Returns the logged summary of a session, or None if the session is not in the log."""
+        offset = self._offsets.get(session_key(settings))
+        if offset is None:
+            return None
+        self._reader.seek(offset)
+        return json.loads(self._reader.readline())["summary"]
+
+    def append(self, settings: dict, summary: dict):
+        """Writes a finished session to the log and flushes it to disk."""
+        self._file.write(json.dumps({"settings": settings, "summary": summary}) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+        self._reader.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
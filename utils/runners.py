@@ -1,21 +1,41 @@
+import logging
+import os
+import random
+import sys
+from contextlib import ExitStack
 from itertools import permutations
-from math import factorial
-from typing import Tuple
+from time import perf_counter
+from typing import Dict, Iterator, List, Optional, Tuple
 
+import numpy as np
+from geniusweb.actions.Accept import Accept
+from geniusweb.actions.Offer import Offer
 from geniusweb.profile.utilityspace.LinearAdditiveUtilitySpace import \
     LinearAdditiveUtilitySpace
-from geniusweb.profileconnection.ProfileConnectionFactory import \
-    ProfileConnectionFactory
 from geniusweb.protocol.NegoSettings import NegoSettings
 from geniusweb.protocol.session.saop.SAOPState import SAOPState
 from geniusweb.simplerunner.ClassPathConnectionFactory import \
     ClassPathConnectionFactory
 from geniusweb.simplerunner.NegoRunner import NegoRunner
 from pyson.ObjectMapper import ObjectMapper
-from uri.uri import URI
+from tudelft_utilities_logging.Reporter import Reporter
 
+from utils import agent_services
+from utils.agent_services import SERVICES_PARAMETER
 from utils.ask_proceed import ask_proceed
-from utils.std_out_reporter import StdOutReporter
+from utils.compiled_profile import CompiledProfile, batch_utilities
+from utils.index_cache import set_index_cache_dir
+from utils.instrumentation import (InstrumentedConnectionFactory,
+                                   InstrumentedReporter, SessionTimer,
+                                   latency_summary)
+from utils.local_saop import LocalSAOPState, run_local_session
+from utils.profile_registry import PROFILE_REGISTRY
+from utils.results_log import ResultsLog
+from utils.scheduler import CostModel, longest_first, simulate_makespan
+from utils.std_out_reporter import BufferedReporter, StdOutReporter
+from utils.virtual_clock import virtual_time
+from utils.watchdog import watching
+from utils.worker_pool import WorkerPool, run_tasks
 
 import json
 
@@ -33,18 +53,46 @@ def get_special_points(file) -> list:
     special_points.append(list(data['kalai']['utility']))
     return special_points
 
-def run_session(settings) -> Tuple[dict, dict]:
+def run_session(settings, trace: bool = True, reporter: Reporter = None) -> Tuple[Optional[dict], dict]:
+    """
+    Runs a negotiation session.
+
+    @param settings the session settings, see run.py
+    @param trace    whether to serialize the trace of the session, without it only the summary is
+                    computed (straight from the actions) and None is returned as trace
+    @param reporter reporter of the session, prints to stdout by default
+    @return the trace and the summary of the session
+    """
+    if reporter is None:
+        reporter = StdOutReporter()
     agents = settings["agents"]
     profiles = settings["profiles"]
     rounds = settings["deadline_rounds"]
+    # optionally time every action, adds wall and think times to the trace and latencies to the summary
+    instrument = settings.get("instrument", False)
+    # "negorunner" runs the session with the GeniusWeb NegoRunner, "local" with the faster in-process engine
+    engine = settings.get("engine", "negorunner")
+    # sleeps of the agents (simulated think times) only advance a virtual clock instead of the wall clock.
+    # Only with the local engine, which reads its deadline from the virtual clock (NegoRunner keeps a wall-clock one)
+    virtual = settings.get("virtual_time", False)
+    # optional parameters of both agents, e.g. {"delay": 1.0} for the simulated think time of a TimeDependentAgent
+    parameters = settings.get("parameters", [{}, {}])
+    # optional seed of the random generators, the agents share them as they run in this process
+    seed = settings.get("seed")
 
     # quick and dirty checks
     assert isinstance(agents, list) and len(agents) == 2
+    assert isinstance(parameters, list) and len(parameters) == 2
     assert isinstance(profiles, list) and len(profiles) == 2
     assert isinstance(rounds, int) and rounds > 0
+    assert engine in ["negorunner", "local"]
+    assert not virtual or engine == "local"
 
     # file path to uri
     profiles_uri = [f"file:{x}" for x in profiles]
+    # the agents of this repository find the shared profiles, bid indexes and the clock of the session in
+    # the services module, they do not import utils themselves
+    parameters = [dict(p, **{SERVICES_PARAMETER: agent_services.__name__}) for p in parameters]
     # create full settings dictionary that geniusweb requires
     settings_full = {
         "SAOPSettings": {
@@ -55,7 +103,7 @@ def run_session(settings) -> Tuple[dict, dict]:
                             {
                                 "party": {
                                     "partyref": f"pythonpath:{agents[0]}",
-                                    "parameters": {},
+                                    "parameters": parameters[0],
                                 },
                                 "profile": profiles_uri[0],
                             }
@@ -68,7 +116,7 @@ def run_session(settings) -> Tuple[dict, dict]:
                             {
                                 "party": {
                                     "partyref": f"pythonpath:{agents[1]}",
-                                    "parameters": {},
+                                    "parameters": parameters[1],
                                 },
                                 "profile": profiles_uri[1],
                             }
@@ -80,40 +128,88 @@ def run_session(settings) -> Tuple[dict, dict]:
         }
     }
 
-    # parse settings dict to settings object
-    settings_obj = ObjectMapper().parse(settings_full, NegoSettings)
+    if seed is not None:
+        random.seed(seed)
+        np.random.seed(seed)
+
+    # a worker with a turn budget needs the turns of the session, they are reported by the timer
+    timer = SessionTimer() if instrument or watching() else None
+    if instrument:
+        # the time the session spent logging, part of the session time but not of the agents
+        reporter = InstrumentedReporter(reporter, timer)
+    with virtual_time(virtual):
+        if engine == "local":
+            # run the negotiation session in this process, no settings parsing or state serialization
+            results_class = run_local_session(settings_full, timer, reporter)
+        else:
+            # parse settings dict to settings object
+            settings_obj = ObjectMapper().parse(settings_full, NegoSettings)
 
-    # create the negotiation session runner object
-    runner = NegoRunner(settings_obj, ClassPathConnectionFactory(), StdOutReporter(), 0)
+            # create the negotiation session runner object
+            if timer is not None:
+                connection_factory = InstrumentedConnectionFactory(timer)
+            else:
+                connection_factory = ClassPathConnectionFactory()
+            runner = NegoRunner(settings_obj, connection_factory, reporter, 0)
 
-    # run the negotiation session
-    runner.run()
+            # run the negotiation session
+            runner.run()
 
-    # get results from the session in class format and dict format
-    results_class: SAOPState = runner.getProtocol().getState()
-    results_dict = ObjectMapper().toJson(results_class)
+            # get results from the session in class format
+            results_class: SAOPState = runner.getProtocol().getState()
+    if instrument:
+        session_time = timer.elapsed()
+        report_time = timer.report_time
+    else:
+        # the timer only reported the turns to the watchdog
+        timer = None
 
-    # add utilities to the results and create a summary
-    results_trace, results_summary = process_results(results_class, results_dict)
+    if trace:
+        # get results in dict format, add utilities to the results and create a summary
+        if isinstance(results_class, LocalSAOPState):
+            results_dict = results_class.toJson()
+        else:
+            results_dict = ObjectMapper().toJson(results_class)
+        results_trace, results_summary = process_results(results_class, results_dict, timer)
+    else:
+        # create the summary straight from the actions
+        results_trace = None
+        party_profiles = get_party_profiles(results_class)
+        utilities = score_actions(results_class.getActions(), party_profiles)
+        results_summary = summarize_actions(results_class.getActions(), party_profiles, utilities, timer)
+    if instrument:
+        results_summary["session_time"] = session_time
+        results_summary["report_time"] = report_time
 
     return results_trace, results_summary
 
 
 def run_tournament(tournament_settings: dict) -> Tuple[list, list]:
+    tournament = []
+    results_summaries = []
+    for settings, results_summary in iter_tournament(tournament_settings):
+        # assemble results
+        tournament.append(settings)
+        results_summaries.append(results_summary)
+
+    return tournament, results_summaries
+
+
+def tournament_sessions(tournament_settings: dict) -> List[dict]:
+    """@return the settings dict of every session of a tournament, in a fixed order"""
     # create agent permutations, ensures that every agent plays against every other agent on both sides of a profile set.
     agents = tournament_settings["agents"]
     profile_sets = tournament_settings["profile_sets"]
     deadline_rounds = tournament_settings["deadline_rounds"]
+    # time every action, the summaries then contain the turn latencies of the agents
+    instrument = tournament_settings.get("instrument", False)
+    # engine that runs the sessions, see run_session
+    engine = tournament_settings.get("engine", "negorunner")
+    # run the sessions on a virtual clock, only with the local engine, see run_session
+    virtual = tournament_settings.get("virtual_time", False)
+    # optional parameters per agent classpath, given to that agent in all its sessions
+    agent_parameters = tournament_settings.get("agent_parameters", {})
 
-    num_sessions = (factorial(len(agents)) // factorial(len(agents) - 2)) * len(profile_sets)
-    if num_sessions > 100:
-        message = f"WARNING: this would run {num_sessions} negotiation sessions. Proceed?"
-        if not ask_proceed(message):
-            print("Exiting script")
-            exit()
-
-
-    results_summaries = []
     tournament = []
     for profiles in profile_sets:
         # quick an dirty check
@@ -125,91 +221,298 @@ def run_tournament(tournament_settings: dict) -> Tuple[list, list]:
                 "profiles": profiles,
                 "deadline_rounds": deadline_rounds,
             }
-
-            # run a single negotiation session
-            _, results_summary = run_session(settings)
-
-            # assemble results
+            if instrument:
+                settings["instrument"] = True
+            if engine != "negorunner":
+                settings["engine"] = engine
+            if virtual:
+                settings["virtual_time"] = True
+            if any(agent in agent_parameters for agent in agent_duo):
+                settings["parameters"] = [agent_parameters.get(agent, {}) for agent in agent_duo]
             tournament.append(settings)
-            results_summaries.append(results_summary)
+    return tournament
+
+
+def tournament_pool(tournament_settings: dict, num_workers: int) -> Optional[WorkerPool]:
+    """
+    @return the pool of warm workers that runs the sessions of a tournament (see run_session_summary), None
+            if they run in this process: with one worker and without budgets
+    """
+    # optional wall-clock budgets in seconds of a session and of a single turn, a session that exceeds one is killed
+    session_timeout = tournament_settings.get("session_timeout")
+    turn_timeout = tournament_settings.get("turn_timeout")
+    if tournament_settings.get("workers", 1) == 1 and session_timeout is None and turn_timeout is None:
+        return None
+    # warm workers: the agents are imported and the profiles loaded once per worker, not per session.
+    # The budgets are enforced from this process, so also a serial tournament with budgets uses a worker
+    return WorkerPool(
+        num_workers,
+        run_session_summary,
+        tournament_settings["agents"],
+        [profile for profiles in tournament_settings["profile_sets"] for profile in profiles],
+        tournament_settings.get("index_cache"),
+        session_timeout,
+        turn_timeout,
+        session_killed,
+    )
 
-    return tournament, results_summaries
+
+def iter_tournament(
+    tournament_settings: dict,
+    sessions: Optional[List[dict]] = None,
+    confirm: bool = True,
+    pool: Optional[WorkerPool] = None,
+) -> Iterator[Tuple[dict, dict]]:
+    """Runs a tournament and yields the settings and summary of every session in the order of the
+    tournament. Nothing is kept in memory, so the caller decides what to store.
+
+    @param tournament_settings the settings of the tournament, see run_tournament.py
+    @param sessions            the settings of the sessions to run, the sessions of the tournament by default
+    @param confirm             ask before running more than 100 sessions
+    @param pool                the pool of tournament_pool to run the sessions in, by default the tournament
+                               starts (and stops) its own
+    """
+    # number of worker processes to spread the sessions over, 1 runs everything in this process
+    workers = tournament_settings.get("workers", 1)
+    assert isinstance(workers, int) and workers > 0
+    # a virtual clock needs the local engine, checked here so it does not fail in every session
+    assert not tournament_settings.get("virtual_time", False) or tournament_settings.get("engine") == "local"
+    # JSONL file to which every finished session is appended, optionally resuming from an earlier run
+    results_log = tournament_settings.get("results_log")
+    resume = tournament_settings.get("resume", False)
+    # without resume, an existing results log is only replaced if that is allowed explicitly
+    overwrite = tournament_settings.get("overwrite", False)
+    # messages of the sessions below this level are dropped, the others are printed per session when it is finished
+    log_level = logging.getLevelName(tournament_settings.get("log_level", "WARNING"))
+    # optional directory with a log file per session, in the order of the tournament
+    log_dir = tournament_settings.get("log_dir")
+    if log_dir is not None:
+        os.makedirs(log_dir, exist_ok=True)
+    # optional directory in which the bid indexes of the profiles are cached across sessions and tournaments
+    index_cache = tournament_settings.get("index_cache")
+    # "longest_first" hands the most expensive sessions to the workers first, "tournament" keeps the tournament order
+    schedule = tournament_settings.get("schedule", "longest_first")
+    assert schedule in ["longest_first", "tournament"]
+    # optional JSON file with the measured cost of every agent, improves the estimates of later tournaments
+    cost_model = CostModel(tournament_settings.get("cost_history"))
+
+    tournament = tournament_sessions(tournament_settings) if sessions is None else sessions
+
+    with ExitStack() as stack:
+        log = stack.enter_context(ResultsLog(results_log, resume, overwrite)) if results_log else None
+        # sessions that are already in the results log are not played again
+        resumed = [log is not None and settings in log for settings in tournament]
+        todo = [
+            (settings, log_level, None if log_dir is None else os.path.join(log_dir, f"session_{index:04d}.log"))
+            for index, settings in enumerate(tournament)
+            if not resumed[index]
+        ]
+
+        num_sessions = len(todo)
+        if confirm and num_sessions > 100:
+            message = f"WARNING: this would run {num_sessions} negotiation sessions. Proceed?"
+            if not ask_proceed(message):
+                print("Exiting script")
+                exit()
+
+        # estimate the running time of every session, the measured times are added to the cost history
+        predictions = [cost_model.predict(settings) for settings, _, _ in todo]
+        order = longest_first(predictions) if schedule == "longest_first" else list(range(num_sessions))
+        num_workers = max(1, min(workers, num_sessions))
+        predicted_makespan = simulate_makespan([predictions[i] for i in order], num_workers)
+        stack.callback(cost_model.save)
+        start = perf_counter()
+
+        # run the negotiation sessions, the results come in the order in which the sessions finish
+        if pool is None:
+            pool = tournament_pool(tournament_settings, num_workers)
+            if pool is None:
+                set_index_cache_dir(index_cache)
+            else:
+                stack.enter_context(pool)
+        results = run_tasks(todo, run_session_summary, pool, order)
+
+        # every result is logged as soon as it is in, so the log holds all finished sessions if the
+        # tournament is interrupted, the results are only yielded in the order of the tournament
+        finished: Dict[int, dict] = {}
+        num_done = 0
+        for settings, is_resumed in zip(tournament, resumed):
+            if is_resumed:
+                results_summary = log.get(settings)
+            else:
+                while num_done not in finished:
+                    task_id, (results_summary, lines), seconds = next(results)
+                    cost_model.observe(todo[task_id][0], seconds, predictions[task_id])
+                    # the messages of a session are printed together, also when it ran in a worker
+                    if lines:
+                        sys.stderr.write("".join(f"{line}\n" for line in lines))
+                    if log is not None:
+                        log.append(todo[task_id][0], results_summary)
+                    finished[task_id] = results_summary
+                results_summary = finished.pop(num_done)
+                num_done += 1
+            yield settings, results_summary
+
+        if num_done:
+            makespan = perf_counter() - start
+            sys.stderr.write(cost_model.report(num_workers, predicted_makespan, makespan) + "\n")
+
+
+def run_session_summary(
+    settings, log_level: int = logging.WARNING, log_file: Optional[str] = None
+) -> Tuple[dict, List[str]]:
+    """Runs a single negotiation session and only returns the summary. The messages of the session
+    are buffered instead of printed and returned with the summary (and written to the log file).
+    """
+    with BufferedReporter(log_level, log_file=log_file) as reporter:
+        with reporter.capture_logging():
+            _, results_summary = run_session(settings, trace=False, reporter=reporter)
+    return results_summary, reporter.getLines()
+
+
+def session_killed(args: tuple, reason: str) -> Tuple[dict, List[str]]:
+    """@return the result of a run_session_summary task with arguments args that was killed, see WorkerPool"""
+    settings = args[0]
+    return timeout_summary(settings, reason), [f"WARNING: session {settings['agents']} killed, {reason}"]
+
+
+def timeout_summary(settings: dict, reason: str) -> dict:
+    """@return the summary of a session that was killed because it exceeded its wall-clock budget"""
+    results_summary = {}
+    for position, agent in enumerate(settings["agents"], 1):
+        results_summary[f"agent_{position}"] = agent.split(".")[-1]
+        results_summary[f"utility_{position}"] = 0
+    results_summary["nash_product"] = 0
+    results_summary["social_welfare"] = 0
+    results_summary["result"] = "ERROR"
+    results_summary["error"] = reason
+    return results_summary
 
 
-def process_results(results_class, results_dict):
+def process_results(results_class, results_dict, timer: SessionTimer = None):
     results_dict = results_dict["SAOPState"]
+    actions = results_class.getActions()
+    utilities = score_actions(actions, results_dict["partyprofiles"])
+
+    num_bid = 0
+    for action_class, action_dict in zip(actions, results_dict["actions"]):
+        if "Offer" in action_dict:
+            offer = action_dict["Offer"]
+        elif "Accept" in action_dict:
+            offer = action_dict["Accept"]
+        else:
+            continue
 
-    # dict to translate geniusweb agent reference to Python class name
-    agent_translate = {
-        k: v["party"]["partyref"].split(".")[-1]
-        for k, v in results_dict["partyprofiles"].items()
-    }
+        # add utility of both agents
+        offer["utilities"] = {k: float(v[num_bid]) for k, v in utilities.items()}
+        num_bid += 1
 
-    results_summary = {}
+        # add the time since the start of the session and the time the agent took for the action
+        if timer is not None:
+            timing = timer.get_timing(action_class)
+            offer["time"], offer["think_time"] = timing if timing is not None else (None, None)
+
+    results_summary = summarize_actions(actions, results_dict["partyprofiles"], utilities, timer)
 
-    # check if there are any actions (could have crashed)
-    if results_dict["actions"]:
-        # obtain utility functions
-        utility_funcs = {
-            k: get_utility_function(v["profile"])
-            for k, v in results_dict["partyprofiles"].items()
+    return results_dict, results_summary
+
+
+def get_party_profiles(results_class) -> Dict[str, dict]:
+    """
+    @return the partyprofiles of the trace, {party id: {"party": {"partyref": ...}, "profile": ...}},
+            read from the state without serializing it
+    """
+    if isinstance(results_class, LocalSAOPState):
+        return results_class.getPartyProfiles()
+    return {
+        party_id.getName(): {
+            "party": {"partyref": str(party_profile.getParty().getPartyRef().getURI())},
+            "profile": str(party_profile.getProfile().getURI()),
         }
+        for party_id, party_profile in results_class.getPartyProfiles().items()
+    }
 
-        # iterate both action classes and dict entries
-        actions_iter = zip(results_class.getActions(), results_dict["actions"])
 
-        for num_offer, (action_class, action_dict) in enumerate(actions_iter):
-            if "Offer" in action_dict:
-                offer = action_dict["Offer"]
-            elif "Accept" in action_dict:
-                offer = action_dict["Accept"]
-            else:
-                continue
+def score_actions(actions: list, party_profiles: Dict[str, dict]) -> Dict[str, np.ndarray]:
+    """@return per party the utilities of the bids of all offers and accepts, in one vectorized call"""
+    bids = [action.getBid() for action in actions if isinstance(action, (Offer, Accept))]
+    if not bids:
+        return {k: np.zeros(0) for k in party_profiles}
+    return batch_utilities(
+        {
+            k: PROFILE_REGISTRY.get_derived(get_utility_function(v["profile"]), "compiled_profile", CompiledProfile)
+            for k, v in party_profiles.items()
+        },
+        bids,
+    )
 
-            # add utility of both agents
-            bid = action_class.getBid()
-            offer["utilities"] = {
-                k: float(v.getUtility(bid)) for k, v in utility_funcs.items()
-            }
 
-        results_summary["num_offers"] = num_offer + 1
+def summarize_actions(
+    actions: list, party_profiles: Dict[str, dict], utilities: Dict[str, np.ndarray], timer: SessionTimer = None
+) -> dict:
+    """
+    Creates the summary of a session from its actions.
+
+    @param actions        the actions of the session, as from SAOPState.getActions()
+    @param party_profiles the partyprofiles of the trace, see get_party_profiles
+    @param utilities      the utilities of the offers and accepts, see score_actions
+    @param timer          SessionTimer of an instrumented session, adds the turn latencies
+    @return the summary of the session
+    """
+    # dict to translate geniusweb agent reference to Python class name
+    agent_translate = {k: v["party"]["partyref"].split(".")[-1] for k, v in party_profiles.items()}
+    # the agents are numbered by their position in the session, the party ids differ per engine
+    positions = {actor: position for position, actor in enumerate(party_profiles, 1)}
+
+    results_summary = {}
+
+    # check if there are any offers or accepts (could have crashed)
+    num_bids = len(next(iter(utilities.values()), []))
+    if num_bids:
+        results_summary["num_offers"] = len(actions)
 
-        # gather a summary of results
-        if "Accept" in action_dict:
-            for actor, utility in offer["utilities"].items():
-                position = actor.split("_")[-1]
+        # gather a summary of results, the last offer or accept is the outcome
+        if isinstance(actions[-1], Accept):
+            for actor, utility in utilities.items():
+                position = positions[actor]
                 results_summary[f"agent_{position}"] = agent_translate[actor]
-                results_summary[f"utility_{position}"] = utility
-            util_1, util_2 = offer["utilities"].values()
+                results_summary[f"utility_{position}"] = float(utility[-1])
+            util_1, util_2 = [float(utility[-1]) for utility in utilities.values()]
             results_summary["nash_product"] = util_1 * util_2
             results_summary["social_welfare"] = util_1 + util_2
             results_summary["result"] = "agreement"
         else:
-            for actor, utility in offer["utilities"].items():
-                position = actor.split("_")[-1]
+            for actor in utilities:
+                position = positions[actor]
                 results_summary[f"agent_{position}"] = agent_translate[actor]
                 results_summary[f"utility_{position}"] = 0
             results_summary["nash_product"] = 0
             results_summary["social_welfare"] = 0
             results_summary["result"] = "failed"
+
+        if timer is not None:
+            think_times = {k: [] for k in party_profiles}
+            for action in actions:
+                timing = timer.get_timing(action)
+                if timing is not None and timing[1] is not None:
+                    think_times[action.getActor().getName()].append(timing[1])
+            results_summary.update(latency_summary(think_times))
     else:
         # something crashed crashed
-        for actor in results_dict["connections"]:
-            position = actor.split("_")[-1]
+        for actor in party_profiles:
+            position = positions[actor]
             results_summary[f"agent_{position}"] = agent_translate[actor]
             results_summary[f"utility_{position}"] = 0
         results_summary["nash_product"] = 0
         results_summary["social_welfare"] = 0
         results_summary["result"] = "ERROR"
 
-    return results_dict, results_summary
+    return results_summary
 
 
 def get_utility_function(profile_uri) -> LinearAdditiveUtilitySpace:
-    profile_connection = ProfileConnectionFactory.create(
-        URI(profile_uri), StdOutReporter()
-    )
-    profile = profile_connection.getProfile()
+    # profiles are parsed once per process and shared with the agents through the registry
+    profile = PROFILE_REGISTRY.get_profile(profile_uri)
     assert isinstance(profile, LinearAdditiveUtilitySpace)
 
     return profile
@@ -0,0 +1,119 @@
+import json
+import math
+import os
+import tempfile
+from typing import Dict, List, Optional
+
+from utils.compiled_profile import CompiledProfile
+from utils.profile_registry import PROFILE_REGISTRY
+
+# version of the layout of the cost history file
+FORMAT_VERSION = 1
+# cost of an agent without history, in seconds per round per log10 of the bid space
+DEFAULT_AGENT_COST = 1e-3
+# the cost of an agent follows its last (about) this many sessions
+HISTORY_WINDOW = 50
+
+
+class CostModel:
+    """
+    Estimates the running time of negotiation sessions:
+
+        cost = deadline_rounds * (1 + log10(bid space size)) * (cost(agent A) + cost(agent B))
+
+    The cost of an agent is learned from the sessions it played, in this and earlier tournaments
+    if a history file is used. The measured time of a session is divided by its rounds and domain
+    factor and split evenly over both agents. An agent that ends its sessions early (e.g. the
+    StupidAgent) so gets a low cost, one that uses the whole deadline in big domains a high cost.
+    """
+
+    def __init__(self, history_file: Optional[str] = None):
+        """@param history_file JSON file with the cost of every agent, read now and written by save"""
+        self._history_file = history_file
+        # cost and number of observed sessions per agent classpath
+        self._agents: Dict[str, dict] = {}
+        if history_file is not None and os.path.exists(history_file):
+            try:
+                with open(history_file, "r") as f:
+                    history = json.load(f)
+                if history.get("format_version") == FORMAT_VERSION:
+                    self._agents = history["agents"]
+            except (OSError, ValueError, KeyError):
+                # a broken history only costs a worse schedule
+                pass
+        # (predicted, actual) time of the sessions observed by this model
+        self._observed: List[tuple] = []
+
+    def get_agent_cost(self, agent: str) -> float:
+        """@return the cost of an agent, the mean of the known agents if it has no history"""
+        if agent in self._agents:
+            return self._agents[agent]["cost"]
+        if self._agents:
+            return sum(entry["cost"] for entry in self._agents.values()) / len(self._agents)
+        return DEFAULT_AGENT_COST
+
+    def predict(self, settings: dict) -> float:
+        """@return the estimated running time of a session in seconds"""
+        return self._scale(settings) * sum(self.get_agent_cost(agent) for agent in settings["agents"])
+
+    def observe(self, settings: dict, seconds: float, predicted: Optional[float] = None):
+        """Updates the cost of the agents of a session with its measured running time."""
+        if predicted is not None:
+            self._observed.append((predicted, seconds))
+        share = seconds / self._scale(settings) / len(settings["agents"])
+        for agent in settings["agents"]:
+            entry = self._agents.setdefault(agent, {"cost": share, "sessions": 0})
+            entry["sessions"] += 1
+            # running mean over the first sessions, then an exponential average over the window
+            entry["cost"] += (share - entry["cost"]) / min(entry["sessions"], HISTORY_WINDOW)
+
+    def save(self):
+        """Writes the agent costs to the history file (atomically), if there is one."""
+        if self._history_file is None:
+            return
+        directory = os.path.dirname(self._history_file) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        with os.fdopen(fd, "w") as f:
+            f.write(json.dumps({"format_version": FORMAT_VERSION, "agents": self._agents}, indent=2))
+        os.replace(tmp, self._history_file)
+
+    def report(self, workers: int, predicted_makespan: float, makespan: float) -> str:
+        """@return a summary of the predicted versus the actual times of the observed sessions"""
+        if not self._observed:
+            return "scheduler: no sessions observed"
+        predicted, actual = zip(*self._observed)
+        error = sum(abs(p - a) for p, a in self._observed) / len(self._observed)
+        return (
+            f"scheduler: {len(self._observed)} sessions on {workers} worker(s), "
+            f"predicted total {sum(predicted):.2f}s, actual total {sum(actual):.2f}s, "
+            f"mean absolute error {error:.3f}s per session\n"
+            f"scheduler: predicted makespan {predicted_makespan:.2f}s, actual makespan {makespan:.2f}s"
+        )
+
+    @staticmethod
+    def _scale(settings: dict) -> float:
+        return settings["deadline_rounds"] * (1 + math.log10(max(1, _space_size(settings["profiles"][0]))))
+
+
+def longest_first(costs: List[float]) -> List[int]:
+    """@return the indices of the costs from high to low, equal costs in their original order"""
+    return sorted(range(len(costs)), key=lambda i: -costs[i])
+
+
+def simulate_makespan(costs: List[float], workers: int) -> float:
+    """@return the makespan of running the costs in the given order, every task on the first free worker"""
+    free = [0.0] * max(1, workers)
+    for cost in costs:
+        i = free.index(min(free))
+        free[i] += cost
+    return max(free)
+
+
+def _space_size(profile_file: str) -> int:
+    """@return the number of bids of the domain of a profile, 1 if the profile cannot be read"""
+    try:
+        profile = PROFILE_REGISTRY.get_profile(profile_file)
+    except OSError:
+        return 1
+    return PROFILE_REGISTRY.get_derived(profile, "compiled_profile", CompiledProfile).get_space_size()
@@ -0,0 +1,143 @@
+import hashlib
+import json
+import os
+from typing import Optional
+
+import numpy as np
+from pyson.ObjectMapper import ObjectMapper
+
+from utils.compiled_profile import CompiledProfile
+from utils.profile_registry import PROFILE_REGISTRY
+
+# number of partial bids that are evaluated at once while building the Pareto frontier
+CHUNK_SIZE = 1 << 20
+
+
+def compute_special_points(profile_a: str, profile_b: str, chunk_size: int = CHUNK_SIZE) -> dict:
+    """
+    Computes the Pareto frontier, Nash point and Kalai point of a pair of profiles over the
+    same domain.
+
+    A Pareto optimal bid only contains Pareto optimal partial bids: if the values of some of
+    its issues could be replaced by values that are better for both agents, so could the whole
+    bid. The frontier is therefore built issue by issue, combining the frontier of the issues
+    so far with the Pareto optimal values of the next issue in chunks of NumPy operations. The
+    work depends on the size of the intermediate frontiers instead of the size of the bid space.
+
+    @param profile_a  path to the profile of the first agent
+    @param profile_b  path to the profile of the second agent
+    @param chunk_size maximum number of partial bids evaluated per NumPy operation
+    @return the special points in the schema of domains/domainXX/specials.json
+    """
+    compiled_a = CompiledProfile(PROFILE_REGISTRY.get_profile(profile_a))
+    compiled_b = CompiledProfile(PROFILE_REGISTRY.get_profile(profile_b))
+    assert compiled_a.same_encoding(compiled_b), "profiles must be defined over the same domain"
+
+    # frontier of the partial bids over the issues so far as value-index vectors and utilities
+    codes = np.zeros((1, 0), dtype=np.int64)
+    utils_a = np.zeros(1)
+    utils_b = np.zeros(1)
+    for issue_index in range(len(compiled_a.get_issues())):
+        values_a = compiled_a.get_issue_utilities(issue_index)
+        values_b = compiled_b.get_issue_utilities(issue_index)
+        values = np.flatnonzero(_pareto_mask(values_a, values_b))
+
+        # extend every partial bid with every Pareto optimal value, chunk by chunk
+        rows = max(1, chunk_size // len(values))
+        new_codes = np.zeros((0, issue_index + 1), dtype=np.int64)
+        new_a = np.empty(0)
+        new_b = np.empty(0)
+        for start in range(0, len(codes), rows):
+            chunk = slice(start, start + rows)
+            chunk_codes = np.concatenate(
+                [
+                    np.repeat(codes[chunk], len(values), axis=0),
+                    np.tile(values, len(codes[chunk]))[:, None],
+                ],
+                axis=1,
+            )
+            chunk_a = (utils_a[chunk, None] + values_a[None, values]).ravel()
+            chunk_b = (utils_b[chunk, None] + values_b[None, values]).ravel()
+            new_codes = np.concatenate([new_codes, chunk_codes])
+            new_a = np.concatenate([new_a, chunk_a])
+            new_b = np.concatenate([new_b, chunk_b])
+            keep = _pareto_mask(new_a, new_b)
+            new_codes, new_a, new_b = new_codes[keep], new_a[keep], new_b[keep]
+        codes, utils_a, utils_b = new_codes, new_a, new_b
+
+    # utilities of the complete bids, computed like process_results does
+    utils_a = compiled_a.utilities(codes)
+    utils_b = compiled_b.utilities(codes)
+
+    # frontier ordered from best for agent b to best for agent a
+    order = np.lexsort((utils_a, -utils_b))
+    codes, utils_a, utils_b = codes[order], utils_a[order], utils_b[order]
+
+    # the Nash and Kalai points are Pareto optimal, so they can be found on the frontier. The
+    # disagreement point is (0, 0) and the Kalai point is the frontier point closest to the line
+    # from there to the ideal point (maximum utilities), as in the shipped specials.json files.
+    nash = int(np.argmax(utils_a * utils_b))
+    kalai = int(np.argmin(np.abs(utils_a / utils_a.max() - utils_b / utils_b.max())))
+
+    def special_point(index: int) -> dict:
+        bid = compiled_a.decode(codes[index])
+        return {
+            "bid": ObjectMapper().toJson(bid)["issuevalues"],
+            "utility": [float(utils_a[index]), float(utils_b[index])],
+        }
+
+    return {
+        "nash": special_point(nash),
+        "kalai": special_point(kalai),
+        "pareto_front": [special_point(i) for i in range(len(codes))],
+    }
+
+
+def write_special_points(
+    profile_a: str,
+    profile_b: str,
+    specials_file: Optional[str] = None,
+    cache_dir: Optional[str] = ".cache/specials",
+) -> dict:
+    """
+    Returns the special points of a pair of profiles, computed once and then cached on disk
+    under the hash of both profile files.
+
+    @param profile_a     path to the profile of the first agent
+    @param profile_b     path to the profile of the second agent
+    @param specials_file optional path to write the special points to (specials.json schema)
+    @param cache_dir     directory of the cache, None disables the cache
+    @return the special points in the schema of domains/domainXX/specials.json
+    """
+    specials = None
+    cache_file = None
+    if cache_dir is not None:
+        key = PROFILE_REGISTRY.get_hash(profile_a) + PROFILE_REGISTRY.get_hash(profile_b)
+        cache_file = os.path.join(cache_dir, hashlib.sha256(key.encode()).hexdigest() + ".json")
+        if os.path.exists(cache_file):
+            with open(cache_file, "r") as f:
+                specials = json.load(f)
+
+    if specials is None:
+        specials = compute_special_points(profile_a, profile_b)
+        if cache_file is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+            with open(cache_file, "w") as f:
+                f.write(json.dumps(specials))
+
+    if specials_file is not None:
+        with open(specials_file, "w") as f:
+            f.write(json.dumps(specials, indent=2))
+    return specials
+
+
+def _pareto_mask(utils_a: np.ndarray, utils_b: np.ndarray) -> np.ndarray:
+    """@return boolean mask of the points that are not dominated by another point (one per duplicate)"""
+    # sort on utility a descending, ties on utility b descending, a point is then Pareto optimal
+    # iff its utility b is higher than that of all points before it
+    order = np.lexsort((-utils_b, -utils_a))
+    sorted_b = utils_b[order]
+    best_before = np.maximum.accumulate(np.concatenate([[-np.inf], sorted_b[:-1]]))
+    mask = np.zeros(len(utils_a), dtype=bool)
+    mask[order[sorted_b > best_before]] = True
+    return mask
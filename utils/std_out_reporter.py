@@ -1,6 +1,8 @@
 import logging
 import sys
-from typing import Optional
+from collections import deque
+from contextlib import contextmanager
+from typing import List, Optional
 
 from tudelft_utilities_logging.Reporter import Reporter
 
@@ -11,3 +13,77 @@ class StdOutReporter(Reporter):
             print(logging.getLevelName(level) + ":" + msg, file=sys.stderr)
         else:
             print(logging.getLevelName(level) + ":" + msg)
+
+
+class BufferedReporter(Reporter):
+    """
+    Reporter for the sessions of a tournament. Messages below a minimum level are dropped, the
+    others are kept in memory instead of printed: the last capacity messages in a ring buffer,
+    and, if a log file is given, all of them in a list that is appended to the file in one write
+    when it reaches capacity and when the reporter is closed.
+
+    Nothing is printed, so sessions in parallel workers do not interleave their output. The
+    worker hands the buffered lines back to the main process, which can print them per session.
+    """
+
+    def __init__(self, level: int = logging.WARNING, capacity: int = 1000, log_file: Optional[str] = None):
+        self._level = level
+        self._capacity = capacity
+        self._buffer = deque(maxlen=capacity)
+        self._log_file = log_file
+        self._pending: List[str] = []
+        if log_file is not None:
+            # start with an empty log file, e.g. when a session is run again
+            open(log_file, "w").close()
+
+    def log(self, level: int, msg: str, exc: Optional[BaseException] = None):
+        if level < self._level:
+            return
+        line = logging.getLevelName(level) + ":" + msg
+        if exc is not None:
+            line += f" ({exc!r})"
+        self._buffer.append(line)
+        if self._log_file is not None:
+            self._pending.append(line)
+            if len(self._pending) >= self._capacity:
+                self.flush()
+
+    def getLines(self) -> List[str]:
+        """@return the last messages (at most capacity), oldest first"""
+        return list(self._buffer)
+
+    def flush(self):
+        """Appends the messages that are not yet in the log file to it."""
+        if self._log_file is not None and self._pending:
+            with open(self._log_file, "a") as f:
+                f.write("\n".join(self._pending) + "\n")
+            self._pending = []
+
+    def close(self):
+        self.flush()
+
+    @contextmanager
+    def capture_logging(self):
+        """Sends the records of the Python logging module (e.g. of agents that log through it) to this reporter."""
+        handler = _ReporterHandler(self)
+        root = logging.getLogger()
+        root.addHandler(handler)
+        try:
+            yield self
+        finally:
+            root.removeHandler(handler)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class _ReporterHandler(logging.Handler):
+    def __init__(self, reporter: Reporter):
+        super().__init__()
+        self._reporter = reporter
+
+    def emit(self, record: logging.LogRecord):
+        self._reporter.log(record.levelno, record.getMessage())
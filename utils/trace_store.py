@@ -0,0 +1,210 @@
+import json
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+from pyson.ObjectMapper import ObjectMapper
+
+from utils.compiled_profile import CompiledProfile
+from utils.profile_registry import PROFILE_REGISTRY
+
+# version of the layout of a trace store directory
+FORMAT_VERSION = 2
+# action types that are stored in the columns, other actions are kept as JSON in the metadata
+ACTION_TYPES = ["Offer", "Accept"]
+# keys of an offer or accept that the columns can hold
+OFFER_KEYS = ["actor", "bid", "utilities", "time", "think_time"]
+
+
+def write_trace_store(results_trace: dict, path: str):
+    """
+    Writes a session trace (as returned by run_session) as a columnar trace store: a directory
+    with a .npy file per column and a meta.json with everything else.
+
+    Columns, one row per action:
+        round      int32    round of the action
+        actor      int8     index of the actor in meta["parties"]
+        type       int8     index of the action type in meta["action_types"], -1 for other actions
+        bid        int64    rank of the bid in the bid space of meta["issues"] and meta["values"],
+                            the rank of BidCodec for the domain, -1 if there is no bid
+        utilities  float64  utility of the bid for every party in meta["parties"], one column each
+        time, think_time    float64, only for instrumented sessions, NaN where missing
+
+    The value tables are stored once in meta.json. Actions that do not fit the columns (other
+    action types, partial bids, ...) are stored as JSON in meta["raw_actions"], so converting the
+    store back with TraceStore.to_json is lossless.
+
+    @param results_trace the trace of a session
+    @param path          the directory to write the store to
+    """
+    actions = results_trace["actions"]
+    parties = list(results_trace["partyprofiles"])
+    issues, values = _value_tables(results_trace)
+    value_index = [{json.dumps(value): i for i, value in enumerate(issue_values)} for issue_values in values]
+    dims = tuple(len(issue_values) for issue_values in values)
+    instrumented = any("think_time" in next(iter(action.values())) for action in actions)
+
+    n = len(actions)
+    columns = {
+        "round": np.arange(n, dtype=np.int32) // max(1, len(parties)),
+        "actor": np.full(n, -1, dtype=np.int8),
+        "type": np.full(n, -1, dtype=np.int8),
+        "bid": np.full(n, -1, dtype=np.int64),
+        "utilities": np.full((n, len(parties)), np.nan),
+    }
+    if instrumented:
+        columns["time"] = np.full(n, np.nan)
+        columns["think_time"] = np.full(n, np.nan)
+
+    raw_actions = {}
+    bid_issue_order = None
+    for i, action in enumerate(actions):
+        (action_type, offer), = action.items()
+        digits = _bid_digits(offer.get("bid"), issues, value_index)
+        if (
+            action_type not in ACTION_TYPES
+            or set(offer) - set(OFFER_KEYS)
+            or offer.get("actor") not in parties
+            or digits is None
+            or list(offer.get("utilities", {})) != parties
+        ):
+            raw_actions[str(i)] = action
+            continue
+
+        columns["actor"][i] = parties.index(offer["actor"])
+        columns["type"][i] = ACTION_TYPES.index(action_type)
+        columns["bid"][i] = np.ravel_multi_index(digits, dims) if dims else 0
+        columns["utilities"][i] = [offer["utilities"][party] for party in parties]
+        if instrumented:
+            for key in ["time", "think_time"]:
+                columns[key][i] = np.nan if offer.get(key) is None else offer[key]
+        if bid_issue_order is None:
+            bid_issue_order = list(offer["bid"]["issuevalues"])
+
+    os.makedirs(path, exist_ok=True)
+    for name, column in columns.items():
+        np.save(os.path.join(path, f"{name}.npy"), column)
+    meta = {
+        "format_version": FORMAT_VERSION,
+        "num_actions": n,
+        "parties": parties,
+        "action_types": ACTION_TYPES,
+        "issues": issues,
+        "values": values,
+        "bid_issue_order": bid_issue_order or issues,
+        "instrumented": instrumented,
+        "raw_actions": raw_actions,
+        # the rest of the trace (connections, partyprofiles, progress, ...)
+        "state": {k: v for k, v in results_trace.items() if k != "actions"},
+    }
+    with open(os.path.join(path, "meta.json"), "w") as f:
+        f.write(json.dumps(meta))
+
+
+def read_trace_store(path: str, mmap: bool = True) -> "TraceStore":
+    """@return the trace store in a directory, its columns memory-mapped unless mmap is False"""
+    return TraceStore(path, mmap)
+
+
+class TraceStore:
+    """Columnar trace of a negotiation session as written by write_trace_store."""
+
+    def __init__(self, path: str, mmap: bool = True):
+        with open(os.path.join(path, "meta.json"), "r") as f:
+            self.meta = json.load(f)
+        assert self.meta["format_version"] == FORMAT_VERSION, f"unsupported trace store version in {path}"
+
+        names = ["round", "actor", "type", "bid", "utilities"]
+        if self.meta["instrumented"]:
+            names += ["time", "think_time"]
+        self.columns: Dict[str, np.ndarray] = {
+            name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r" if mmap else None) for name in names
+        }
+        assert all(len(column) == self.meta["num_actions"] for column in self.columns.values())
+        self._dims = tuple(len(values) for values in self.meta["values"])
+
+    def __len__(self) -> int:
+        return self.meta["num_actions"]
+
+    def get_parties(self) -> List[str]:
+        return list(self.meta["parties"])
+
+    def decode_bids(self, codes: np.ndarray) -> List[dict]:
+        """@return the issuevalues dicts of the bids with the given ranks"""
+        if not self._dims:
+            return [{} for _ in codes]
+        digits = np.stack(np.unravel_index(np.asarray(codes), self._dims), axis=-1).tolist()
+        order = [self.meta["issues"].index(issue) for issue in self.meta["bid_issue_order"]]
+        values = self.meta["values"]
+        return [{self.meta["issues"][i]: values[i][row[i]] for i in order} for row in digits]
+
+    def to_json(self) -> dict:
+        """
+        @return the trace in the JSON shape of run_session, equal to the original trace (also
+                without the profiles, the utilities are stored as the float64 values of the trace)
+        """
+        parties = self.meta["parties"]
+        utilities = self.columns["utilities"]
+        bids = self.decode_bids(self.columns["bid"][self.columns["type"] >= 0])
+
+        actions = []
+        num_bid = 0
+        for i in range(len(self)):
+            if str(i) in self.meta["raw_actions"]:
+                actions.append(self.meta["raw_actions"][str(i)])
+                continue
+            offer = {
+                "actor": parties[self.columns["actor"][i]],
+                "bid": {"issuevalues": bids[num_bid]},
+                "utilities": {party: float(utilities[i, p]) for p, party in enumerate(parties)},
+            }
+            num_bid += 1
+            if self.meta["instrumented"]:
+                for key in ["time", "think_time"]:
+                    value = float(self.columns[key][i])
+                    offer[key] = None if np.isnan(value) else value
+            actions.append({self.meta["action_types"][self.columns["type"][i]]: offer})
+
+        results_trace = {"actions": actions}
+        results_trace.update(self.meta["state"])
+        return results_trace
+
+
+def _value_tables(results_trace: dict):
+    """@return the sorted issues and the JSON values of every issue, from the domain if available"""
+    for party_profile in results_trace["partyprofiles"].values():
+        compiled = _compiled_profile(party_profile["profile"])
+        if compiled is not None:
+            mapper = ObjectMapper()
+            return compiled.get_issues(), [
+                [mapper.toJson(value) for value in values] for values in compiled.get_values()
+            ]
+
+    # no profile available, use the values that occur in the trace
+    seen: Dict[str, Dict[str, object]] = {}
+    for action in results_trace["actions"]:
+        offer = next(iter(action.values()))
+        for issue, value in offer.get("bid", {}).get("issuevalues", {}).items():
+            seen.setdefault(issue, {})[json.dumps(value)] = value
+    issues = sorted(seen)
+    return issues, [[seen[issue][key] for key in sorted(seen[issue])] for issue in issues]
+
+
+def _bid_digits(bid: Optional[dict], issues: List[str], value_index: List[dict]) -> Optional[tuple]:
+    """@return the value indices of a complete bid, None if it is not complete or has unknown values"""
+    if bid is None or set(bid) != {"issuevalues"}:
+        return None
+    issuevalues = bid["issuevalues"]
+    if set(issuevalues) != set(issues):
+        return None
+    digits = tuple(index.get(json.dumps(issuevalues[issue]), -1) for issue, index in zip(issues, value_index))
+    return None if -1 in digits else digits
+
+
+def _compiled_profile(profile_uri: str) -> Optional[CompiledProfile]:
+    try:
+        profile = PROFILE_REGISTRY.get_profile(profile_uri)
+    except OSError:
+        return None
+    return PROFILE_REGISTRY.get_derived(profile, "compiled_profile", CompiledProfile)
+
@@ -0,0 +1,63 @@
+import time as _time
+from contextlib import contextmanager
+from typing import Iterator
+
+
+class VirtualClock:
+    """
+    Clock that runs at wall-clock speed but skips sleeps: sleep returns at once and moves the
+    clock forward instead. The clock so reads the time a real-time run would read, without the
+    idle waiting. Agents and the local engine read time through this module, the runner decides
+    per session which clock that is.
+    """
+
+    def __init__(self):
+        # seconds of sleep skipped so far
+        self._offset = 0.0
+
+    def time(self) -> float:
+        return _time.time() + self._offset
+
+    def sleep(self, seconds: float):
+        if seconds < 0:
+            raise ValueError("sleep length must be non-negative")
+        self._offset += seconds
+
+    def get_skipped(self) -> float:
+        """@return the seconds of sleep skipped so far"""
+        return self._offset
+
+
+# the virtual clock of the session that runs in this process, None uses the wall clock
+_clock = None
+
+
+def time() -> float:
+    """@return the current time in seconds since the epoch, virtual in a session with virtual time"""
+    return _time.time() if _clock is None else _clock.time()
+
+
+def sleep(seconds: float):
+    """Sleeps, or only advances the virtual time in a session with virtual time."""
+    if _clock is None:
+        _time.sleep(seconds)
+    else:
+        _clock.sleep(seconds)
+
+
+@contextmanager
+def virtual_time(enabled: bool = True) -> Iterator[VirtualClock]:
+    """
+    Runs the code in the block (a negotiation session) on a fresh virtual clock, which is yielded.
+    With enabled False the wall clock is kept and None is yielded.
+    """
+    global _clock
+    if not enabled:
+        yield None
+        return
+    previous = _clock
+    _clock = VirtualClock()
+    try:
+        yield _clock
+    finally:
+        _clock = previous
@@ -0,0 +1,64 @@
+from time import monotonic
+from typing import Optional
+
+# fields of the watch slot of a worker process, a shared array of doubles
+TASK, TASK_START, TURN_START = range(3)
+SLOT_SIZE = 3
+
+# watch slot of this process when it is a worker of a WorkerPool with a turn budget, None otherwise
+_slot = None
+
+
+def set_watch_slot(slot):
+    """Makes this process report the turns of its sessions to a watch slot (None stops reporting)."""
+    global _slot
+    _slot = slot
+
+
+def watching() -> bool:
+    """@return whether this process reports its turns to a watchdog"""
+    return _slot is not None
+
+
+def task_started(slot, task_id: int):
+    with slot.get_lock():
+        slot[TASK] = task_id
+        slot[TASK_START] = monotonic()
+        slot[TURN_START] = 0.0
+
+
+def task_finished(slot):
+    """Clears the task of a slot, the watchdog leaves the worker alone from then on."""
+    with slot.get_lock():
+        slot[TASK] = -1
+        slot[TURN_START] = 0.0
+
+
+def turn_started():
+    """Called when a party gets a YourTurn, the turn budget runs from now until turn_ended."""
+    if _slot is not None:
+        with _slot.get_lock():
+            _slot[TURN_START] = monotonic()
+
+
+def turn_ended():
+    """Called when the action of a party arrived."""
+    if _slot is not None:
+        with _slot.get_lock():
+            _slot[TURN_START] = 0.0
+
+
+def check_slot(slot, session_timeout: Optional[float], turn_timeout: Optional[float]) -> Optional[str]:
+    """
+    Must be called with the lock of the slot held.
+
+    @return the reason why the task in a slot is over its budget, None if it is not (or there is no task)
+    """
+    if slot[TASK] < 0:
+        return None
+    now = monotonic()
+    if session_timeout is not None and now - slot[TASK_START] > session_timeout:
+        return f"timeout: session exceeded its budget of {session_timeout}s"
+    if turn_timeout is not None and slot[TURN_START] > 0 and now - slot[TURN_START] > turn_timeout:
+        return f"timeout: turn exceeded its budget of {turn_timeout}s"
+    return None
@@ -0,0 +1,271 @@
+import importlib
+import multiprocessing
+import traceback
+from collections import deque
+from multiprocessing.connection import wait
+from time import monotonic, perf_counter
+from typing import Any, Callable, Iterator, List, Optional, Tuple
+
+from utils.compiled_profile import CompiledProfile
+from utils.index_cache import set_index_cache_dir
+from utils.profile_registry import PROFILE_REGISTRY
+from utils.watchdog import (SLOT_SIZE, TASK, TASK_START, check_slot,
+                            set_watch_slot, task_finished, task_started)
+
+
+class WorkerPool:
+    """
+    Long-lived worker processes for the sessions of a tournament. Every worker imports the agent
+    classes and parses (and compiles) the profiles once when it starts, and keeps them in its
+    profile registry for all sessions it runs. Sessions are handed to the workers one at a time, so
+    a worker that finishes early gets the next one, and results are reported back as soon as a
+    session is done.
+
+    Nothing of a session outlives it in a worker except the caches of the profile registry: the
+    parties are new instances for every session and get their profile through the registry.
+
+    With a session or turn budget the pool is also a watchdog: every worker publishes its current
+    task and the start of the current turn in a shared slot, and a worker that runs over a budget
+    is killed and replaced, its task gets the result of on_timeout. A worker that dies is replaced
+    as well, with or without a task.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        function: Callable[..., Any],
+        agents: List[str] = (),
+        profiles: List[str] = (),
+        index_cache: Optional[str] = None,
+        session_timeout: Optional[float] = None,
+        turn_timeout: Optional[float] = None,
+        on_timeout: Optional[Callable[[tuple, str], Any]] = None,
+    ):
+        """
+        @param workers         number of worker processes
+        @param function        module level function that runs a task, called with the arguments of the task
+        @param agents          classpaths of the agents to import in every worker
+        @param profiles        paths of the profiles to load in every worker
+        @param index_cache     directory of the on-disk bid index cache of the workers, see set_index_cache_dir
+        @param session_timeout wall-clock budget of a task in seconds, None for no budget
+        @param turn_timeout    wall-clock budget of a turn in seconds (the time from a YourTurn until the
+                               action of the party), None for no budget
+        @param on_timeout      creates the result of a task that was killed from the arguments of the task and
+                               the reason, without it a killed task raises a RuntimeError in results
+        """
+        assert workers > 0
+        self._context = multiprocessing.get_context()
+        self._function = function
+        self._preload = (list(agents), list(profiles), index_cache)
+        self._session_timeout = session_timeout
+        self._turn_timeout = turn_timeout
+        self._on_timeout = on_timeout
+        # task ids that are submitted and have no result yet, the tasks that wait for a worker, and the
+        # arguments of the tasks that are handed out (for on_timeout, or to queue them again when a worker dies
+        # before it starts one)
+        self._pending = set()
+        self._queue = deque()
+        self._tasks = {}
+        # every worker gets its tasks and sends its results over its own pipe, so a worker that is
+        # killed or dies cannot leave a shared channel in a broken state, and the task it had is known
+        self._slots = [self._context.Array("d", SLOT_SIZE) for _ in range(workers)]
+        self._processes = [None] * workers
+        self._connections = [None] * workers
+        self._assigned = [-1] * workers
+        # whether a worker finished a task, and whether it replaces one that died before it finished one
+        self._finished = [False] * workers
+        self._respawned = [False] * workers
+        for i in range(workers):
+            self._start_worker(i)
+
+    def _start_worker(self, i: int):
+        self._slots[i][TASK] = -1
+        connection, worker_connection = self._context.Pipe()
+        self._processes[i] = self._context.Process(
+            target=_worker_main,
+            args=(worker_connection, self._slots[i], self._function, self._turn_timeout is not None) + self._preload,
+            daemon=True,
+        )
+        self._processes[i].start()
+        worker_connection.close()
+        self._connections[i] = connection
+        self._assigned[i] = -1
+        self._finished[i] = False
+
+    def submit(self, task_id: int, args: tuple):
+        """Queues a task, its result is returned by results under task_id (a non-negative int)."""
+        assert task_id >= 0 and task_id not in self._pending
+        self._queue.append((task_id, args))
+        self._pending.add(task_id)
+        self._dispatch()
+
+    def _dispatch(self):
+        """Hands the queued tasks to the idle workers."""
+        for i, connection in enumerate(self._connections):
+            if not self._queue:
+                return
+            if self._assigned[i] >= 0:
+                continue
+            task = self._queue.popleft()
+            try:
+                connection.send(task)
+            except OSError:
+                # the worker died, handled by _check_workers
+                self._queue.appendleft(task)
+                continue
+            self._assigned[i] = task[0]
+            self._tasks[task[0]] = task[1]
+
+    def results(self) -> Iterator[Tuple[int, Any, float]]:
+        """
+        Yields (task id, result, seconds the task ran) of all submitted tasks in the order in
+        which they finish. An exception in a task is raised here as RuntimeError with the
+        traceback of the worker.
+        """
+        watched = self._session_timeout is not None or self._turn_timeout is not None
+        while self._pending:
+            for connection in wait(self._connections, timeout=0.1 if watched else 1):
+                yield from self._receive(self._connections.index(connection))
+            self._dispatch()
+            yield from self._check_workers()
+
+    def _receive(self, i: int) -> Iterator[Tuple[int, Any, float]]:
+        """Yields the results that are waiting in the pipe of worker i."""
+        connection = self._connections[i]
+        while True:
+            try:
+                if not connection.poll():
+                    return
+                task_id, error, result, seconds = connection.recv()
+            except (EOFError, OSError):
+                # the worker died, handled by _check_workers
+                return
+            self._assigned[i] = -1
+            self._finished[i] = True
+            self._tasks.pop(task_id, None)
+            self._pending.discard(task_id)
+            if error is not None:
+                raise RuntimeError(f"task {task_id} failed in a worker:\n{error}")
+            yield task_id, result, seconds
+
+    def _check_workers(self) -> Iterator[Tuple[int, Any, float]]:
+        """Kills the workers whose task is over its budget and replaces them and the ones that died."""
+        for i, (process, slot) in enumerate(zip(self._processes, self._slots)):
+            with slot.get_lock():
+                reason = check_slot(slot, self._session_timeout, self._turn_timeout)
+                if reason is None and process.is_alive():
+                    continue
+            if reason is None:
+                reason = f"worker process died with exit code {process.exitcode}"
+            process.kill()
+            process.join()
+            # a result that was sent before the worker was killed or died still counts
+            yield from self._receive(i)
+            task_id = self._assigned[i]
+            if task_id >= 0 and slot[TASK] != task_id:
+                # the worker died before it started the task, another worker runs it
+                self._queue.appendleft((task_id, self._tasks[task_id]))
+                task_id = -1
+            idle = task_id < 0 and not self._finished[i]
+            if idle and self._respawned[i]:
+                # neither this worker nor the one before it got through a task, they die while starting
+                raise RuntimeError(f"workers of the pool fail to start: {reason}")
+            seconds = monotonic() - slot[TASK_START]
+            self._connections[i].close()
+            self._start_worker(i)
+            self._respawned[i] = idle
+            if task_id < 0:
+                continue
+            args = self._tasks.pop(task_id)
+            self._pending.discard(task_id)
+            if self._on_timeout is None:
+                raise RuntimeError(f"task {task_id} was killed: {reason}")
+            yield task_id, self._on_timeout(args, reason), seconds
+        self._dispatch()
+
+    def close(self):
+        """Stops the workers, the ones that do not stop within a few seconds are killed."""
+        for connection in self._connections:
+            try:
+                connection.send(None)
+            except OSError:
+                continue
+        for process, connection in zip(self._processes, self._connections):
+            process.join(timeout=5)
+            if process.is_alive():
+                process.kill()
+            connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def _worker_main(
+    connection, slot, function, watch_turns: bool, agents: List[str], profiles: List[str], index_cache: Optional[str]
+):
+    set_index_cache_dir(index_cache)
+    if watch_turns:
+        set_watch_slot(slot)
+    _preload(agents, profiles)
+
+    while True:
+        task = connection.recv()
+        if task is None:
+            return
+        task_id, args = task
+        task_started(slot, task_id)
+        start = perf_counter()
+        try:
+            result = function(*args)
+            error = None
+        except Exception:
+            result, error = None, traceback.format_exc()
+        # the slot is cleared after the result is sent, so the budget also covers sending it
+        connection.send((task_id, error, result, perf_counter() - start))
+        task_finished(slot)
+
+
+def _preload(agents: List[str], profiles: List[str]):
+    """Imports the agent classes and loads the profiles into the profile registry of this process."""
+    for classpath in agents:
+        try:
+            module, _ = classpath.rsplit(".", 1)
+            importlib.import_module(module)
+        except Exception:
+            # reported by the session that uses the agent
+            continue
+    for profile_file in profiles:
+        try:
+            profile = PROFILE_REGISTRY.get_profile(profile_file)
+        except OSError:
+            # reported by the session that uses the profile
+            continue
+        PROFILE_REGISTRY.get_derived(profile, "compiled_profile", CompiledProfile)
+
+
+def run_tasks(
+    tasks: List[tuple],
+    function: Callable[..., Any],
+    pool: Optional[WorkerPool] = None,
+    order: Optional[List[int]] = None,
+) -> Iterator[Tuple[int, Any, float]]:
+    """
+    Runs tasks in a worker pool (or in this process without pool) and yields the index of every
+    task with its result and running time in seconds, in the order in which the tasks finish.
+
+    @param order the indices of the tasks in the order in which they are handed to the workers,
+                 the order of the tasks by default (ignored without pool)
+    """
+    if pool is None:
+        for task_id, args in enumerate(tasks):
+            start = perf_counter()
+            result = function(*args)
+            yield task_id, result, perf_counter() - start
+        return
+
+    for task_id in range(len(tasks)) if order is None else order:
+        pool.submit(task_id, tasks[task_id])
+    yield from pool.results()